@@ -1,6 +1,7 @@
 import os
 import time
 import logging
+import logging.handlers
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -10,16 +11,1226 @@ from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.keys import Keys
 import requests
 import json
-from typing import Optional, Dict, Any
+import re
+import zlib
+import ast
+import math
+import random
+import string
+import subprocess
+import threading
+import functools
+import inspect
+import queue
+import uuid
+import signal
+import argparse
+import socket
+import sqlite3
+import gzip
+import glob
+import shutil
+import atexit
+import contextvars
+import copy
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from collections import deque
+from contextlib import closing, contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, Any, List, Tuple
 import sys
+try:
+    import fcntl
+except ImportError:  # Windows: state files are saved without a cross-process lock
+    fcntl = None
+import numpy as np
 from groq import Groq
 
+try:
+    import redis
+except ImportError:
+    redis = None
+
+_LOG_CONTEXT = contextvars.ContextVar('leetcode_log_context', default={})
+_LOG_LISTENER = None
+DEFAULT_WORKER_ID = f"{socket.gethostname()}-{os.getpid()}"
+
+
+def update_log_context(**fields):
+    """Tag subsequent log events from this thread with problem/attempt/worker ids"""
+    context = dict(_LOG_CONTEXT.get())
+    context.update(fields)
+    _LOG_CONTEXT.set(context)
+
+
+class LogContextFilter(logging.Filter):
+    """Copy the caller's log context onto the record before it leaves the thread"""
+
+    def filter(self, record):
+        context = _LOG_CONTEXT.get()
+        record.problem = context.get('problem')
+        record.attempt = context.get('attempt')
+        record.worker = context.get('worker') or DEFAULT_WORKER_ID
+        return True
+
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record):
+        event = {
+            "ts": record.created,
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "msg": record.getMessage(),
+            "problem": getattr(record, 'problem', None),
+            "attempt": getattr(record, 'attempt', None),
+            "worker": getattr(record, 'worker', None),
+            "thread": record.threadName,
+        }
+        exc = record.exc_text or (self.formatException(record.exc_info) if record.exc_info else None)
+        if exc:
+            event["exc"] = exc
+        return json.dumps(event, ensure_ascii=False)
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps the traceback in exc_text instead of folding it into msg"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Size-based rotation that gzips each rolled-over file"""
+
+    def __init__(self, filename: str, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.namer = lambda name: name + '.gz'
+        self.rotator = self._compress
+
+    @staticmethod
+    def _compress(source: str, dest: str):
+        with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+
+def _process_alive(pid: int) -> bool:
+    if os.name == 'nt':
+        return True  # os.kill would terminate it; fall back to the idle age
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def apply_log_retention(log_dir: str, current: str, max_files: int = 50,
+                        idle_seconds: float = 24 * 3600) -> Tuple[int, int]:
+    """Retention across the files of all processes: gzip logs of processes that are gone
+    (or idle for idle_seconds when on another host), then delete the oldest files beyond
+    max_files. Returns (compressed, removed).
+    """
+    now = time.time()
+    host_prefix = f"agent-{socket.gethostname()}-"
+    compressed = removed = 0
+    for path in glob.glob(os.path.join(log_dir, 'agent-*.jsonl')):
+        if os.path.abspath(path) == os.path.abspath(current):
+            continue
+        name = os.path.basename(path)[:-len('.jsonl')]
+        pid = name[len(host_prefix):] if name.startswith(host_prefix) else ''
+        try:
+            mtime = os.path.getmtime(path)
+            if pid.isdigit():
+                if _process_alive(int(pid)):
+                    continue
+            elif now - mtime < idle_seconds:
+                continue
+            # 'xb' so two processes starting at once don't both compress the same file
+            with open(path, 'rb') as f_in, gzip.open(path + '.gz', 'xb') as f_out:
+                shutil.copyfileobj(f_in, f_out)
+            os.utime(path + '.gz', (mtime, mtime))
+            os.remove(path)
+            compressed += 1
+        except OSError:
+            continue
+    
+    archived = [path for path in glob.glob(os.path.join(log_dir, 'agent-*.jsonl*')) if path.endswith('.gz')]
+    archived.sort(key=os.path.getmtime, reverse=True)
+    for path in archived[max_files:]:
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            continue
+    return compressed, removed
+
+
+def setup_log_pipeline(log_dir: str = 'logs', max_bytes: int = 10 * 1024 * 1024, backup_count: int = 10,
+                       max_files: int = 50):
+    """Route all logging through a queue drained by a background listener thread.
+
+    The file gets structured JSON lines (one file per process, rotated and
+    gzipped by size); the console keeps the human-readable format. At startup
+    the logs of finished processes are gzipped and at most max_files archives kept.
+    """
+    global _LOG_LISTENER
+    if _LOG_LISTENER is not None:
+        return
+    
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, f"agent-{DEFAULT_WORKER_ID}.jsonl")
+    compressed, removed = apply_log_retention(log_dir, log_path, max_files=max_files)
+    file_handler = CompressingRotatingFileHandler(
+        log_path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+    )
+    file_handler.setFormatter(JsonLogFormatter())
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    
+    log_queue = queue.Queue(-1)
+    queue_handler = StructuredQueueHandler(log_queue)
+    queue_handler.addFilter(LogContextFilter())
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(queue_handler)
+    
+    _LOG_LISTENER = logging.handlers.QueueListener(log_queue, file_handler, console_handler,
+                                                   respect_handler_level=True)
+    _LOG_LISTENER.start()
+    atexit.register(_LOG_LISTENER.stop)
+    if compressed or removed:
+        logging.getLogger(__name__).info(
+            f"🗄️ Log retention: compressed {compressed} finished log(s), removed {removed} old archive(s)"
+        )
+
+
+class LogQuery:
+    """Filter and aggregate structured logs of past runs, including rotated .gz files"""
+
+    def __init__(self, log_dir: str = 'logs'):
+        self.log_dir = log_dir
+
+    def _paths(self) -> List[str]:
+        # Rotated files are older than the live file; oldest first
+        return sorted(glob.glob(os.path.join(self.log_dir, 'agent-*.jsonl*')), key=os.path.getmtime)
+
+    def events(self, problem: str = None, worker: str = None, level: str = None,
+               grep: str = None, since: float = None):
+        """Yield matching events; the text filter runs before JSON parsing"""
+        min_level = logging.getLevelName(level.upper()) if level else None
+        for path in self._paths():
+            opener = gzip.open if path.endswith('.gz') else open
+            with opener(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    if grep and grep not in line:
+                        continue
+                    if problem and problem not in line:
+                        continue
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue
+                    if problem and event.get('problem') != problem:
+                        continue
+                    if worker and event.get('worker') != worker:
+                        continue
+                    if min_level and logging.getLevelName(event.get('level')) < min_level:
+                        continue
+                    if since and event.get('ts', 0) < since:
+                        continue
+                    yield event
+
+    def stats(self, events) -> Dict[str, Dict[str, Any]]:
+        """Per-problem summary: attempts, warnings/errors, duration and outcome"""
+        problems = {}
+        for event in events:
+            key = event.get('problem') or '<none>'
+            entry = problems.setdefault(key, {"events": 0, "attempts": 0, "warnings": 0, "errors": 0,
+                                              "first": event['ts'], "last": event['ts'], "solved": False,
+                                              "workers": set()})
+            entry["events"] += 1
+            entry["attempts"] = max(entry["attempts"], event.get('attempt') or 0)
+            entry["warnings"] += event['level'] == 'WARNING'
+            entry["errors"] += event['level'] in ('ERROR', 'CRITICAL')
+            entry["first"] = min(entry["first"], event['ts'])
+            entry["last"] = max(entry["last"], event['ts'])
+            entry["solved"] = entry["solved"] or 'solved successfully' in event['msg'] or 'solution accepted' in event['msg']
+            entry["workers"].add(event.get('worker'))
+        return problems
+
+    def run(self, stats: bool = False, **filters):
+        events = self.events(**filters)
+        if not stats:
+            for event in events:
+                tags = "/".join(str(event[k]) for k in ('worker', 'problem', 'attempt') if event.get(k))
+                print(f"{event['time']} {event['level']:<8} [{tags}] {event['msg']}")
+            return
+        for problem, entry in sorted(self.stats(events).items(), key=lambda item: item[1]["first"]):
+            print(f"{problem:<50} {'solved' if entry['solved'] else 'unsolved':<9} "
+                  f"attempts={entry['attempts']} warnings={entry['warnings']} errors={entry['errors']} "
+                  f"duration={entry['last'] - entry['first']:.1f}s workers={len(entry['workers'])}")
+
+@contextmanager
+def file_lock(path: str):
+    """Hold an exclusive lock on path + '.lock' across processes (POSIX only)"""
+    if fcntl is None:
+        yield
+        return
+    with open(path + '.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class ModelRouter:
+    """Pick a Groq model and token limit per call from difficulty, attempt and history"""
+
+    # Escalation ladder: fast small models first, the large model last
+    MODEL_TIERS = [
+        {"models": ["llama-3.1-8b-instant", "openai/gpt-oss-20b"], "max_tokens": 1024},
+        {"models": ["openai/gpt-oss-20b", "llama-3.3-70b-versatile"], "max_tokens": 2048},
+        {"models": ["openai/gpt-oss-120b"], "max_tokens": 4096},
+    ]
+    START_TIER = {"Easy": 0, "Medium": 1, "Hard": 1}
+    DEFAULT_LATENCY = 5.0
+    LATENCY_ALPHA = 0.3
+
+    def __init__(self, stats_path: str = 'model_router_stats.json',
+                 decisions_path: str = 'model_routing.jsonl'):
+        self.stats_path = stats_path
+        self.decisions_path = decisions_path
+        self.stats = self._load_stats()
+        # Counter increments not yet merged into the stats file
+        self._deltas = {}
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+
+    def _load_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Load per-model history from disk"""
+        try:
+            with open(self.stats_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_stats(self):
+        """Merge this process's counts into the stats file and replace it atomically.
+
+        Other processes (e.g. queue workers) may have saved since we loaded,
+        so counters are re-read and our increments added on top of them while
+        holding a lock file, so no other process can read-merge-write in between.
+        """
+        try:
+            with file_lock(self.stats_path):
+                merged = self._load_stats()
+                for key, delta in self._deltas.items():
+                    entry = merged.setdefault(key, {"calls": 0, "errors": 0, "judged": 0, "accepted": 0,
+                                                    "latency_ema": None})
+                    for field, count in delta.items():
+                        entry[field] = entry.get(field, 0) + count
+                    if self.stats[key]["latency_ema"] is not None:
+                        entry["latency_ema"] = self.stats[key]["latency_ema"]
+                tmp_path = f"{self.stats_path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(merged, f, indent=2)
+                os.replace(tmp_path, self.stats_path)
+        except OSError as e:
+            self.logger.warning(f"Could not save router stats: {e}")
+            return
+        self.stats = merged
+        self._deltas = {}
+
+    def _bump(self, model: str, difficulty: str, field: str):
+        """Increment a counter in memory and remember it for the next merge"""
+        key = f"{model}|{difficulty}"
+        self._model_stats(model, difficulty)[field] += 1
+        delta = self._deltas.setdefault(key, {})
+        delta[field] = delta.get(field, 0) + 1
+
+    def _record_event(self, event: Dict[str, Any]):
+        """Append a routing decision or outcome for later tuning"""
+        try:
+            with open(self.decisions_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(event) + '\n')
+        except OSError as e:
+            self.logger.warning(f"Could not record routing event: {e}")
+
+    def _model_stats(self, model: str, difficulty: str) -> Dict[str, Any]:
+        key = f"{model}|{difficulty}"
+        if key not in self.stats:
+            self.stats[key] = {"calls": 0, "errors": 0, "judged": 0, "accepted": 0, "latency_ema": None}
+        return self.stats[key]
+
+    def _score(self, model: str, difficulty: str) -> float:
+        """Expected accepted solutions per second of generation"""
+        stats = self._model_stats(model, difficulty)
+        accept_rate = (stats["accepted"] + 1) / (stats["judged"] + 2)
+        error_rate = (stats["errors"] + 0.5) / (stats["calls"] + 1)
+        latency = stats["latency_ema"] or self.DEFAULT_LATENCY
+        return accept_rate * (1 - error_rate) / max(latency, 0.1)
+
+    def choose(self, difficulty: str, attempt: int) -> Dict[str, Any]:
+        """Return a routing decision for this call"""
+        with self._lock:
+            start = self.START_TIER.get(difficulty, 1)
+            tier_index = min(start + attempt - 1, len(self.MODEL_TIERS) - 1)
+            tier = self.MODEL_TIERS[tier_index]
+            model = max(tier["models"], key=lambda m: self._score(m, difficulty))
+
+            decision = {
+                "time": time.time(),
+                "event": "decision",
+                "difficulty": difficulty,
+                "attempt": attempt,
+                "tier": tier_index,
+                "model": model,
+                "max_tokens": tier["max_tokens"],
+            }
+            self._record_event(decision)
+            return decision
+
+    def record_generation(self, decision: Dict[str, Any], latency: float, ok: bool):
+        """Record how long the model took and whether it returned usable code"""
+        with self._lock:
+            stats = self._model_stats(decision["model"], decision["difficulty"])
+            self._bump(decision["model"], decision["difficulty"], "calls")
+            if ok:
+                previous = stats["latency_ema"]
+                stats["latency_ema"] = latency if previous is None else (
+                    self.LATENCY_ALPHA * latency + (1 - self.LATENCY_ALPHA) * previous
+                )
+            else:
+                self._bump(decision["model"], decision["difficulty"], "errors")
+            self._save_stats()
+            self._record_event({**decision, "event": "generation", "time": time.time(),
+                                "latency": round(latency, 3), "ok": ok})
+
+    def record_outcome(self, decision: Dict[str, Any], accepted: bool, result_text: str = ""):
+        """Record the judge verdict for a generated solution"""
+        with self._lock:
+            self._bump(decision["model"], decision["difficulty"], "judged")
+            if accepted:
+                self._bump(decision["model"], decision["difficulty"], "accepted")
+            self._save_stats()
+            self._record_event({**decision, "event": "outcome", "time": time.time(),
+                                "accepted": accepted, "result": result_text[:200]})
+
+
+class SolutionLibrary:
+    """Persistent store of accepted solutions with a MinHash LSH similarity index"""
+
+    NUM_PERM = 64
+    BAND_ROWS = 2
+    SHINGLE_SIZE = 3
+
+    def __init__(self, path: str = 'solution_library.json'):
+        self.path = path
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        rng = np.random.RandomState(1)
+        self._hash_a = rng.randint(1, 2**32, size=self.NUM_PERM, dtype=np.uint64) | np.uint64(1)
+        self._hash_b = rng.randint(0, 2**32, size=self.NUM_PERM, dtype=np.uint64)
+        self.entries = self._load()
+        self._slugs = []
+        self._rows = {}
+        self._buckets = {}
+        self._matrix = np.empty((0, self.NUM_PERM), dtype=np.uint32)
+        self._index(list(self.entries))
+
+    @staticmethod
+    def slug_from_url(problem_url: str) -> str:
+        """Extract the problem slug from a LeetCode problem URL"""
+        match = re.search(r'/problems/([^/?#]+)', problem_url)
+        return match.group(1) if match else problem_url.rstrip('/')
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, slug: str):
+        """Write one added or removed entry on top of the file as other processes left it"""
+        try:
+            with file_lock(self.path):
+                stored = self._load()
+                if slug in self.entries:
+                    stored[slug] = self.entries[slug]
+                else:
+                    stored.pop(slug, None)
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(stored, f)
+                os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.logger.warning(f"Could not save solution library: {e}")
+            return
+        self._sync(stored)
+
+    def _sync(self, stored: Dict[str, Dict[str, Any]]):
+        """Pick up entries other processes added, replaced or removed since we loaded"""
+        for slug in [slug for slug in self.entries if slug not in stored]:
+            self._unindex(slug)
+            del self.entries[slug]
+        changed = [slug for slug, entry in stored.items() if self.entries.get(slug) != entry]
+        for slug in changed:
+            if slug in self._rows:
+                self._unindex(slug)
+            self.entries[slug] = stored[slug]
+        self._index(changed)
+
+    def _signature(self, text: str) -> np.ndarray:
+        """MinHash signature over word shingles of the text"""
+        tokens = re.findall(r'[a-z0-9]+', text.lower())
+        size = self.SHINGLE_SIZE
+        shingles = {' '.join(tokens[i:i + size]) for i in range(max(len(tokens) - size + 1, 1))}
+        shingles.discard('')
+        if not shingles:
+            return np.full(self.NUM_PERM, 0xFFFFFFFF, dtype=np.uint32)
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        permuted = (np.outer(hashes, self._hash_a) + self._hash_b) & np.uint64(0xFFFFFFFF)
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        raw = signature.tobytes()
+        width = self.BAND_ROWS * 4
+        return [bytes([band]) + raw[band * width:(band + 1) * width]
+                for band in range(self.NUM_PERM // self.BAND_ROWS)]
+
+    def _index(self, slugs: List[str]):
+        """Add stored signatures for these slugs to the matrix and LSH buckets"""
+        if not slugs:
+            return
+        signatures = np.array([self.entries[slug]["signature"] for slug in slugs], dtype=np.uint32)
+        for slug, signature in zip(slugs, signatures):
+            self._rows[slug] = len(self._slugs)
+            self._slugs.append(slug)
+            for key in self._band_keys(signature):
+                self._buckets.setdefault(key, set()).add(slug)
+        self._matrix = np.vstack([self._matrix, signatures])
+
+    def _unindex(self, slug: str):
+        """Drop a slug from the buckets and swap the last matrix row into its place"""
+        row = self._rows.pop(slug)
+        for key in self._band_keys(self._matrix[row]):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(slug)
+                if not bucket:
+                    del self._buckets[key]
+        last = self._slugs.pop()
+        if last != slug:
+            self._matrix[row] = self._matrix[-1]
+            self._slugs[row] = last
+            self._rows[last] = row
+        self._matrix = self._matrix[:-1]
+
+    def get(self, slug: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(slug)
+
+    def add(self, slug: str, problem_data: Dict[str, Any], code: str):
+        """Store an accepted solution and index its description"""
+        with self._lock:
+            if slug in self._rows:
+                self._unindex(slug)
+            self.entries[slug] = {
+                "title": problem_data.get('title', ''),
+                "difficulty": problem_data.get('difficulty', ''),
+                "code": code,
+                "accepted_at": time.time(),
+                "signature": self._signature(problem_data.get('description', '')).tolist(),
+            }
+            self._index([slug])
+            self._save(slug)
+
+    def remove(self, slug: str):
+        """Drop a solution that no longer passes"""
+        with self._lock:
+            if slug not in self.entries:
+                return
+            self._unindex(slug)
+            del self.entries[slug]
+            self._save(slug)
+
+    def similar(self, description: str, k: int = 2, exclude: Optional[str] = None,
+                min_score: float = 0.2) -> List[Dict[str, Any]]:
+        """Return up to k accepted solutions whose descriptions are closest to this one"""
+        with self._lock:
+            signature = self._signature(description)
+            candidates = set()
+            for key in self._band_keys(signature):
+                candidates.update(self._buckets.get(key, ()))
+            candidates.discard(exclude)
+            if not candidates:
+                return []
+
+            slugs = list(candidates)
+            scores = (self._matrix[[self._rows[slug] for slug in slugs]] == signature).mean(axis=1)
+            results = []
+            for i in np.argsort(-scores)[:k]:
+                if scores[i] < min_score:
+                    break
+                results.append({"slug": slugs[i], "score": float(scores[i]), **self.entries[slugs[i]]})
+            return results
+
+
+class PerformanceGate:
+    """Time candidate solutions locally on synthesized inputs to catch TLE before submitting"""
+
+    SIZE_FRACTIONS = [0.125, 0.25, 0.5, 1.0]
+    TIME_BUDGET = 1.5
+    DEFAULT_LENGTH = 10**4
+    DEFAULT_VALUE_RANGE = (-10**4, 10**4)
+    MAX_ELEMENTS = 2 * 10**5
+    MEMORY_LIMIT = 2 * 1024**3
+    OUT_OF_MEMORY = 3
+
+    RUNNER = """
+import json, sys, time
+from typing import *
+import collections, heapq, math, bisect, itertools, functools, string, re
+from collections import *
+from heapq import *
+from math import *
+from bisect import *
+from itertools import *
+from functools import *
+sys.setrecursionlimit(10**6)
+payload = json.load(sys.stdin)
+try:
+    import resource
+    resource.setrlimit(resource.RLIMIT_AS, (payload['memory_limit'], payload['memory_limit']))
+    resource.setrlimit(resource.RLIMIT_CPU, (payload['cpu_seconds'], payload['cpu_seconds'] + 1))
+except (ImportError, ValueError, OSError):
+    pass  # no rlimits on this platform: the parent's wall-clock timeout still applies
+exec(payload['code'], globals())
+method = getattr(Solution(), payload['method'])
+start = time.perf_counter()
+try:
+    method(*payload['args'])
+except MemoryError:
+    sys.exit(3)
+print(json.dumps({'elapsed': time.perf_counter() - start}))
+"""
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def _parse_bound(token: str, flattened: bool = False):
+        """Parse a constraint bound like 10^4, -10^9, 2 * 10^5 or 10⁴
+
+        When the description lost its <sup> markup (flattened), 103..109 are read as 10^3..10^9;
+        101 and 102 stay literal since they are as likely to be real bounds.
+        """
+        superscripts = str.maketrans('⁰¹²³⁴⁵⁶⁷⁸⁹⁻', '0123456789-')
+        text = token.strip().rstrip('.,;').replace(' ', '').replace('**', '^')
+        text = re.sub(r'[⁰¹²³⁴⁵⁶⁷⁸⁹⁻]+', lambda m: '^' + m.group(0).translate(superscripts), text)
+        match = re.fullmatch(r'(-?)(?:(\d+)\*)?10\^(\d+)', text)
+        if match:
+            sign = -1 if match.group(1) else 1
+            return sign * int(match.group(2) or 1) * 10 ** int(match.group(3))
+        match = re.fullmatch(r'(-?)10([3-9])', text)
+        if flattened and match:
+            return (-1 if match.group(1) else 1) * 10 ** int(match.group(2))
+        if re.fullmatch(r'-?\d+', text):
+            return int(text)
+        return text or None
+
+    def parse_constraints(self, description: str) -> Dict[str, Tuple[Any, Any]]:
+        """Map constrained expressions (nums.length, nums[i], n, ...) to (low, high) bounds"""
+        bounds = {}
+        aliases = []
+        flattened = not re.search(r'\^|\*\*|[⁰¹²³⁴⁵⁶⁷⁸⁹]', description)
+        for line in description.replace('≤', '<=').replace('≥', '>=').splitlines():
+            line = line.strip()
+            chain = re.match(r'^(.+?)\s*<=?\s*(.+?)\s*<=?\s*(.+)$', line)
+            if chain:
+                low = self._parse_bound(chain.group(1), flattened)
+                high = self._parse_bound(chain.group(3), flattened)
+                for name in chain.group(2).split(','):
+                    bounds[name.strip()] = (low, high)
+                continue
+            equal = re.match(r'^([\w\[\].]+)\s*==\s*([\w\[\].]+)$', line)
+            if equal:
+                aliases.append((equal.group(1), equal.group(2)))
+        for left, right in aliases:
+            if left in bounds and right not in bounds:
+                bounds[right] = bounds[left]
+            elif right in bounds and left not in bounds:
+                bounds[left] = bounds[right]
+        return bounds
+
+    @staticmethod
+    def method_signature(code: str, template: str = "") -> Optional[Tuple[str, List[Tuple[str, str]]]]:
+        """Return the public Solution method name and its (param, annotation) pairs"""
+        def first_method(source):
+            try:
+                tree = ast.parse(source)
+            except SyntaxError:
+                # LeetCode templates end with an empty method body
+                try:
+                    tree = ast.parse(source.rstrip() + "\n        pass")
+                except SyntaxError:
+                    return None
+            for node in tree.body:
+                if isinstance(node, ast.ClassDef) and node.name == 'Solution':
+                    for item in node.body:
+                        if isinstance(item, ast.FunctionDef) and not item.name.startswith('_'):
+                            return item
+            return None
+
+        method = first_method(code)
+        if method is None:
+            return None
+        annotations = {arg.arg: ast.unparse(arg.annotation) for arg in method.args.args[1:] if arg.annotation}
+        template_method = first_method(template) if template else None
+        if template_method is not None and template_method.name == method.name:
+            for arg in template_method.args.args[1:]:
+                if arg.annotation and arg.arg not in annotations:
+                    annotations[arg.arg] = ast.unparse(arg.annotation)
+        params = [(arg.arg, annotations.get(arg.arg, '')) for arg in method.args.args[1:]]
+        return method.name, params
+
+    def _resolve(self, value, generated: Dict[str, Any], default):
+        """Resolve a bound that may refer to another parameter (e.g. nums.length)"""
+        if isinstance(value, int):
+            return value
+        if isinstance(value, str):
+            name = value.split('.')[0].split('[')[0]
+            if name in generated:
+                ref = generated[name]
+                if isinstance(ref, int):
+                    return ref
+                if isinstance(ref, (list, str)):
+                    return len(ref)
+        return default
+
+    def build_args(self, params: List[Tuple[str, str]], bounds: Dict[str, Tuple[Any, Any]],
+                   fraction: float, rng: random.Random) -> Optional[List[Any]]:
+        """Synthesize arguments scaled to the given fraction of the constraint maximum"""
+        def limit(default, *keys):
+            for key in keys:
+                if key in bounds:
+                    return self._resolve(bounds[key][1], generated, default)
+            return default
+
+        def value_range(*keys):
+            for key in keys:
+                if key in bounds:
+                    low, high = bounds[key]
+                    low = self._resolve(low, generated, self.DEFAULT_VALUE_RANGE[0])
+                    high = self._resolve(high, generated, self.DEFAULT_VALUE_RANGE[1])
+                    if low <= high:
+                        return low, high
+            return self.DEFAULT_VALUE_RANGE
+
+        def scaled(maximum, factor):
+            return max(1, min(int(maximum * factor), self.MAX_ELEMENTS))
+
+        generated = {}
+        order = sorted(params, key=lambda p: p[1].replace(' ', '').lower() in ('int', 'float', 'bool'))
+        for name, annotation in order:
+            kind = annotation.replace(' ', '').replace('list[', 'List[')
+            if kind == 'List[int]':
+                size = scaled(limit(self.DEFAULT_LENGTH, f'{name}.length'), fraction)
+                low, high = value_range(f'{name}[i]')
+                generated[name] = [rng.randint(low, high) for _ in range(size)]
+            elif kind == 'List[List[int]]':
+                # Scale both sides by sqrt so the cell count grows with the fraction
+                side = math.sqrt(fraction)
+                rows = scaled(limit(100, f'{name}.length', 'm'), side)
+                cols = min(scaled(limit(100, f'{name}[i].length', 'n'), side), max(1, self.MAX_ELEMENTS // rows))
+                low, high = value_range(f'{name}[i][j]')
+                generated[name] = [[rng.randint(low, high) for _ in range(cols)] for _ in range(rows)]
+            elif kind == 'str':
+                size = scaled(limit(self.DEFAULT_LENGTH, f'{name}.length'), fraction)
+                generated[name] = ''.join(rng.choice(string.ascii_lowercase) for _ in range(size))
+            elif kind == 'List[str]':
+                word_length = max(1, min(10, limit(10, f'{name}[i].length')))
+                count = min(scaled(limit(self.DEFAULT_LENGTH, f'{name}.length'), fraction),
+                            self.MAX_ELEMENTS // word_length)
+                generated[name] = [''.join(rng.choice(string.ascii_lowercase) for _ in range(word_length))
+                                   for _ in range(count)]
+            elif kind == 'int':
+                if name in bounds:
+                    low, high = value_range(name)
+                    generated[name] = low + int((high - low) * fraction)
+                else:
+                    generated[name] = rng.randint(1, 100)
+            elif kind == 'bool':
+                generated[name] = rng.random() < 0.5
+            elif kind == 'float':
+                generated[name] = rng.uniform(*value_range(name))
+            else:
+                return None
+        return [generated[name] for name, _ in params]
+
+    def _time_run(self, code: str, method: str, args: List[Any]) -> Optional[float]:
+        """Run one call in an isolated, resource-limited interpreter; inf on timeout or exhaustion, None on error"""
+        # The runner applies the rlimits to itself before exec'ing the candidate;
+        # preexec_fn is not safe here since the agent process runs threads
+        payload = json.dumps({"code": code, "method": method, "args": args,
+                              "memory_limit": self.MEMORY_LIMIT, "cpu_seconds": math.ceil(self.TIME_BUDGET) + 1})
+        try:
+            completed = subprocess.run(
+                [sys.executable, '-I', '-c', self.RUNNER],
+                input=payload, capture_output=True, text=True,
+                timeout=self.TIME_BUDGET + 1
+            )
+        except subprocess.TimeoutExpired:
+            return math.inf
+        limit_signals = [getattr(signal, name) for name in ('SIGXCPU', 'SIGKILL') if hasattr(signal, name)]
+        if completed.returncode == self.OUT_OF_MEMORY or -completed.returncode in limit_signals:
+            return math.inf
+        if completed.returncode != 0:
+            return None
+        try:
+            return json.loads(completed.stdout.strip().splitlines()[-1])['elapsed']
+        except (ValueError, IndexError, KeyError):
+            return None
+
+    def profile(self, code: str, problem_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Time a candidate at growing input sizes and estimate its empirical complexity"""
+        report = {"status": "skip", "timings": [], "exponent": None, "max_time": None}
+        signature = self.method_signature(code, problem_data.get('code_template', ''))
+        if signature is None:
+            return report
+        method, params = signature
+        bounds = self.parse_constraints(problem_data.get('description', ''))
+
+        for fraction in self.SIZE_FRACTIONS:
+            args = self.build_args(params, bounds, fraction, random.Random(int(fraction * 1000)))
+            if args is None:
+                self.logger.info("Performance gate skipped: unsupported parameter types")
+                return report
+            elapsed = self._time_run(code, method, args)
+            if elapsed is None:
+                continue
+            report["timings"].append((fraction, elapsed))
+            report["max_time"] = elapsed
+            if elapsed > self.TIME_BUDGET:
+                report["status"] = "reject"
+                break
+        else:
+            if report["timings"]:
+                report["status"] = "pass"
+
+        measurable = [(f, t) for f, t in report["timings"] if 1e-3 < t < math.inf]
+        if len(measurable) >= 2:
+            fractions, times = zip(*measurable)
+            report["exponent"] = float(np.polyfit(np.log(fractions), np.log(times), 1)[0])
+        return report
+
+    def rank(self, candidates: List[Dict[str, Any]], problem_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Profile candidates and order them: passing first, fastest first"""
+        for candidate in candidates:
+            if "report" not in candidate:
+                candidate["report"] = self.profile(candidate["code"], problem_data)
+                report = candidate["report"]
+                max_time = f"{report['max_time']:.3f}s" if report["max_time"] is not None else "n/a"
+                exponent = f"{report['exponent']:.2f}" if report["exponent"] is not None else "n/a"
+                self.logger.info(
+                    f"⏱️ Performance gate: {report['status']} "
+                    f"(max time {max_time}, empirical exponent {exponent})"
+                )
+        status_order = {"pass": 0, "skip": 1, "reject": 2}
+        return sorted(candidates, key=lambda c: (
+            status_order[c["report"]["status"]],
+            c["report"]["max_time"] if c["report"]["max_time"] is not None else math.inf
+        ))
+
+
+class CommandProfiler:
+    """Record WebDriver commands and agent method calls as Chrome trace events
+
+    Only the most recent max_events events are kept for the trace, so a long-running
+    worker doesn't grow without bound; the command summary covers the whole run.
+    """
+
+    def __init__(self, max_events: int = 100000):
+        self.events = deque(maxlen=max_events)
+        self.recorded = 0
+        self.totals = {}
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self._local = threading.local()
+        self.logger = logging.getLogger(__name__)
+
+    def _now_us(self) -> float:
+        return (time.perf_counter() - self.origin) * 1e6
+
+    def _stack(self) -> List[str]:
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def _record(self, name: str, category: str, start_us: float, args: Dict[str, Any]):
+        event = {
+            "name": name, "cat": category, "ph": "X",
+            "ts": round(start_us, 1), "dur": round(self._now_us() - start_us, 1),
+            "pid": self.pid, "tid": threading.get_ident(), "args": args,
+        }
+        with self.lock:
+            self.events.append(event)
+            self.recorded += 1
+            if category == "webdriver":
+                self._tally(event)
+
+    def _tally(self, event: Dict[str, Any]):
+        key = (event["args"]["caller"], event["name"], event["args"]["selector"])
+        entry = self.totals.setdefault(key, {"caller": key[0], "command": key[1], "selector": key[2],
+                                             "count": 0, "total_ms": 0.0, "errors": 0})
+        entry["count"] += 1
+        entry["total_ms"] += event["dur"] / 1000
+        if event["args"]["outcome"] != "ok":
+            entry["errors"] += 1
+
+    @staticmethod
+    def _describe(params: Optional[Dict[str, Any]]) -> str:
+        """Short description of a command's target: selector, script or URL"""
+        if not params:
+            return ""
+        if 'using' in params:
+            return f"{params['using']}={params.get('value')}"
+        if 'script' in params:
+            return " ".join(str(params['script']).split())[:80]
+        if 'url' in params:
+            return str(params['url'])
+        if 'cmd' in params:
+            return str(params['cmd'])
+        return ""
+
+    def attach_driver(self, driver):
+        """Time every command the driver (and its elements) send to chromedriver"""
+        execute = driver.execute
+
+        def profiled_execute(driver_command, params=None):
+            stack = self._stack()
+            caller = stack[-1] if stack else "<outside agent>"
+            start = self._now_us()
+            outcome = "ok"
+            try:
+                return execute(driver_command, params)
+            except Exception as e:
+                outcome = type(e).__name__
+                raise
+            finally:
+                self._record(driver_command, "webdriver", start, {
+                    "selector": self._describe(params), "outcome": outcome, "caller": caller
+                })
+
+        driver.execute = profiled_execute
+
+    def instrument(self, agent, exclude: Tuple[str, ...] = ()):
+        """Wrap the agent's methods so they appear as spans and own the commands they issue"""
+        for name, _ in inspect.getmembers(type(agent), inspect.isfunction):
+            if name.startswith('__') or name in exclude:
+                continue
+            setattr(agent, name, self._wrap(getattr(agent, name), name))
+
+    def _wrap(self, method, name: str):
+        @functools.wraps(method)
+        def profiled(*args, **kwargs):
+            with self.span(name):
+                return method(*args, **kwargs)
+        return profiled
+
+    @contextmanager
+    def span(self, name: str, **args):
+        """Record a Python-side span; WebDriver commands inside it are attributed to it"""
+        stack = self._stack()
+        stack.append(name)
+        start = self._now_us()
+        outcome = "ok"
+        try:
+            yield
+        except BaseException as e:
+            outcome = type(e).__name__
+            raise
+        finally:
+            stack.pop()
+            self._record(name, "agent", start, {**args, "outcome": outcome})
+
+    def summary(self, top: int = 15) -> List[Dict[str, Any]]:
+        """Aggregate commands by calling method, command name and selector, slowest first"""
+        with self.lock:
+            totals = [dict(entry) for entry in self.totals.values()]
+        return sorted(totals, key=lambda e: e["total_ms"], reverse=True)[:top]
+
+    def log_summary(self, top: int = 15):
+        with self.lock:
+            count = sum(entry["count"] for entry in self.totals.values())
+        self.logger.info(f"🔬 {count} WebDriver commands recorded; slowest selectors/waits:")
+        for entry in self.summary(top):
+            self.logger.info(
+                f"  {entry['total_ms']:9.1f} ms  {entry['count']:4d}x  {entry['errors']:4d} err  "
+                f"{entry['caller']} -> {entry['command']} {entry['selector']}"
+            )
+
+    def export(self, path: str):
+        """Write a Chrome trace-event file (open in chrome://tracing or Perfetto)"""
+        with self.lock:
+            events = list(self.events)
+            dropped = self.recorded - len(events)
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid,
+             "args": {"name": names.get(tid, f"thread-{tid}")}}
+            for tid in {event["tid"] for event in events}
+        ]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f)
+        note = f", oldest {dropped} dropped" if dropped else ""
+        self.logger.info(f"🔬 Trace written to {path} ({len(events)} events{note})")
+
+
+class UsageLedger:
+    """Token and cost accounting per Groq call, per problem and per batch"""
+
+    # Approximate USD per million (prompt, completion) tokens; keep in sync with Groq pricing
+    MODEL_PRICES = {
+        "llama-3.1-8b-instant": (0.05, 0.08),
+        "openai/gpt-oss-20b": (0.075, 0.30),
+        "llama-3.3-70b-versatile": (0.59, 0.79),
+        "openai/gpt-oss-120b": (0.15, 0.60),
+    }
+    DEFAULT_PRICE = (0.59, 0.79)
+    DEFAULT_PROBLEM_TOKENS = {"Easy": 3000, "Medium": 6000, "Hard": 10000}
+
+    def __init__(self, path: str = 'token_usage.jsonl'):
+        self.path = path
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self.problems = {}
+        self.batches = {}
+        # Finished-problem history per difficulty: [problems, solved, tokens, cost]
+        self.history = {}
+        self._load_history()
+
+    def _load_history(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if '"event": "problem"' not in line:
+                        continue
+                    try:
+                        self._add_history(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            pass
+
+    def _add_history(self, problem: Dict[str, Any]):
+        entry = self.history.setdefault(problem.get('difficulty') or 'Unknown', [0, 0, 0, 0.0])
+        entry[0] += 1
+        entry[1] += bool(problem.get('solved'))
+        entry[2] += problem.get('total_tokens', 0)
+        entry[3] += problem.get('cost', 0.0)
+
+    def _append(self, event: Dict[str, Any]):
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(event) + '\n')
+        except OSError as e:
+            self.logger.warning(f"Could not record token usage: {e}")
+
+    def cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        prompt_price, completion_price = self.MODEL_PRICES.get(model, self.DEFAULT_PRICE)
+        return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1e6
+
+    @staticmethod
+    def _empty_totals() -> Dict[str, Any]:
+        return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0,
+                "cost": 0.0, "latency": 0.0}
+
+    def start_problem(self, batch: str, slug: str):
+        with self._lock:
+            self.problems[(batch, slug)] = {**self._empty_totals(), "difficulty": None}
+            self.batches.setdefault(batch, {**self._empty_totals(), "problems": 0, "solved": 0})
+
+    def record_call(self, batch: str, slug: str, difficulty: str, attempt: int, model: str,
+                    usage: Any, latency: float) -> Dict[str, Any]:
+        """Account one chat completion from its response.usage"""
+        prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+        completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+        total_tokens = getattr(usage, 'total_tokens', 0) or prompt_tokens + completion_tokens
+        call = {
+            "event": "call", "ts": time.time(), "batch": batch, "problem": slug,
+            "difficulty": difficulty, "attempt": attempt, "model": model,
+            "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": total_tokens, "cost": self.cost(model, prompt_tokens, completion_tokens),
+            "latency": round(latency, 3),
+            "completion_tokens_per_s": round(completion_tokens / latency, 1) if latency > 0 else None,
+        }
+        with self._lock:
+            problem = self.problems.setdefault((batch, slug), {**self._empty_totals(), "difficulty": None})
+            batch_totals = self.batches.setdefault(batch, {**self._empty_totals(), "problems": 0, "solved": 0})
+            problem["difficulty"] = difficulty
+            for totals in (problem, batch_totals):
+                totals["calls"] += 1
+                for key in ("prompt_tokens", "completion_tokens", "total_tokens", "cost", "latency"):
+                    totals[key] += call[key]
+            self._append(call)
+        return call
+
+    def finish_problem(self, batch: str, slug: str, solved: bool) -> Dict[str, Any]:
+        """Close a problem's accounting and return its totals"""
+        with self._lock:
+            problem = self.problems.pop((batch, slug), None) or {**self._empty_totals(), "difficulty": None}
+            summary = {"event": "problem", "ts": time.time(), "batch": batch, "problem": slug,
+                       "solved": solved, **problem}
+            batch_totals = self.batches.setdefault(batch, {**self._empty_totals(), "problems": 0, "solved": 0})
+            batch_totals["problems"] += 1
+            batch_totals["solved"] += bool(solved)
+            self._add_history(summary)
+            self._append(summary)
+        return summary
+
+    def finish_batch(self, batch: str) -> Dict[str, Any]:
+        with self._lock:
+            summary = {"event": "batch", "ts": time.time(), "batch": batch,
+                       **self.batches.get(batch, self._empty_totals())}
+            self._append(summary)
+        return summary
+
+    def expected_tokens(self, difficulty: str) -> float:
+        """Mean tokens spent per problem of this difficulty so far"""
+        with self._lock:
+            entry = self.history.get(difficulty)
+        if entry and entry[0]:
+            return entry[2] / entry[0]
+        return self.DEFAULT_PROBLEM_TOKENS.get(difficulty, 6000)
+
+    def expected_cost(self, difficulty: str) -> float:
+        with self._lock:
+            entry = self.history.get(difficulty)
+        if entry and entry[0] and entry[2]:
+            return entry[3] / entry[0]
+        return self.expected_tokens(difficulty) * sum(self.DEFAULT_PRICE) / 2 / 1e6
+
+    def solve_rate(self, difficulty: str) -> float:
+        with self._lock:
+            entry = self.history.get(difficulty, [0, 0, 0, 0.0])
+        return (entry[1] + 1) / (entry[0] + 2)
+
+
+class TokenBudget:
+    """Token-per-minute and total-spend caps shared by every concurrent solve"""
+
+    WINDOW = 60.0
+
+    def __init__(self, tokens_per_minute: Optional[int] = None, max_spend: Optional[float] = None):
+        self.tokens_per_minute = tokens_per_minute
+        self.max_spend = max_spend
+        self.spent = 0.0
+        self.reserved_cost = 0.0
+        # Set once a call is refused because its estimated cost no longer fits the cap
+        self.refused = False
+        self.window = deque()
+        self.condition = threading.Condition()
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def limited(self) -> bool:
+        return self.tokens_per_minute is not None or self.max_spend is not None
+
+    def exhausted(self) -> bool:
+        """True once the spend cap is reached or too little is left for another call"""
+        with self.condition:
+            return self.refused or (self.max_spend is not None and self.spent >= self.max_spend)
+
+    def remaining_spend(self) -> Optional[float]:
+        with self.condition:
+            if self.max_spend is None:
+                return None
+            return max(self.max_spend - self.spent - self.reserved_cost, 0.0)
+
+    def is_tight(self, estimated_tokens: float, estimated_cost: float) -> bool:
+        """True when the work ahead does not fit comfortably in the caps"""
+        remaining = self.remaining_spend()
+        if remaining is not None and estimated_cost > remaining:
+            return True
+        return self.tokens_per_minute is not None and estimated_tokens > self.tokens_per_minute
+
+    def acquire(self, estimated_tokens: int, estimated_cost: float = 0.0) -> Optional[list]:
+        """Reserve tokens in the current minute and the call's estimated cost, waiting if needed.
+
+        Calls in flight hold their estimated cost until settled, so concurrent solves
+        cannot overshoot the spend cap together. None once the call cannot fit the cap.
+        """
+        with self.condition:
+            while True:
+                if self.max_spend is not None and self.spent + estimated_cost > self.max_spend:
+                    self.refused = True
+                    return None
+                now = time.time()
+                while self.window and self.window[0][0] <= now - self.WINDOW:
+                    self.window.popleft()
+                used = sum(reservation[1] for reservation in self.window)
+                tokens_fit = (self.tokens_per_minute is None or not self.window
+                              or used + estimated_tokens <= self.tokens_per_minute)
+                spend_fits = (self.max_spend is None
+                              or self.spent + self.reserved_cost + estimated_cost <= self.max_spend)
+                if tokens_fit and spend_fits:
+                    reservation = [now, estimated_tokens, estimated_cost]
+                    self.window.append(reservation)
+                    self.reserved_cost += estimated_cost
+                    return reservation
+                if not tokens_fit:
+                    wait = self.window[0][0] + self.WINDOW - now
+                    self.logger.info(f"⏳ Token budget: waiting {wait:.1f}s for the per-minute window")
+                else:
+                    wait = None
+                    self.logger.info("⏳ Token budget: waiting for in-flight calls to settle their spend")
+                self.condition.wait(wait)
+
+    def settle(self, reservation: list, actual_tokens: int, cost: float):
+        """Replace a reservation's estimates with the tokens and cost actually used"""
+        with self.condition:
+            reservation[1] = actual_tokens
+            self.reserved_cost = max(self.reserved_cost - reservation[2], 0.0)
+            reservation[2] = 0.0
+            self.spent += cost
+            self.condition.notify_all()
+
+
 class LeetCodeAgent:
-    def __init__(self, groq_api_key: str = None):
+    def __init__(self, groq_api_key: str = None, profiler: Optional[CommandProfiler] = None,
+                 token_budget: Optional[TokenBudget] = None):
         self.driver = None
+        self.profiler = profiler
         self.session = requests.Session()
         self.is_logged_in = False
         self.groq_client = None
+        self.model_router = ModelRouter()
+        self.solution_library = SolutionLibrary()
+        self.performance_gate = PerformanceGate()
+        self.max_candidates = 2
+        self.usage_ledger = UsageLedger()
+        self.token_budget = token_budget or TokenBudget()
+        self.batch_id = uuid.uuid4().hex[:8]
+        self.last_usage = None
+        self.last_routing_decision = None
+        self.last_verdict = None
+        self.last_result_text = ""
         self.max_retries = 3
         self.retry_delay = 5
         
@@ -29,6 +1240,9 @@ class LeetCodeAgent:
         self.setup_logging()
         self.setup_headers()
         
+        if self.profiler:
+            self.profiler.instrument(self, exclude=('setup_logging', 'setup_headers'))
+        
     def setup_headers(self):
         """Setup headers for requests"""
         self.session.headers.update({
@@ -37,14 +1251,7 @@ class LeetCodeAgent:
         
     def setup_logging(self):
         """Setup logging configuration"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('leetcode_agent.log', encoding='utf-8'),
-                logging.StreamHandler(sys.stdout)
-            ]
-        )
+        setup_log_pipeline()
         self.logger = logging.getLogger(__name__)
 
     def init_driver(self):
@@ -59,8 +1266,15 @@ class LeetCodeAgent:
             options.add_argument('--start-maximized')
             options.add_argument('--disable-gpu')
             
+            # Capture network events so judge verdicts can be read from the check responses
+            options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+            options.add_experimental_option('perfLoggingPrefs', {'enableNetwork': True, 'enablePage': False})
+            
             self.driver = webdriver.Chrome(options=options)
+            if self.profiler:
+                self.profiler.attach_driver(self.driver)
             self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            self.driver.execute_cdp_cmd('Network.enable', {})
             self.logger.info("Chrome driver initialized successfully")
             return True
         except Exception as e:
@@ -132,6 +1346,29 @@ class LeetCodeAgent:
             self.logger.error(f"Manual login process failed: {e}")
             return False
 
+    def login_with_cookies(self, cookies: List[Dict[str, Any]]) -> bool:
+        """Reuse the session cookies of an already logged-in browser"""
+        try:
+            if not self.driver:
+                if not self.init_driver():
+                    return False
+            
+            self.driver.get("https://leetcode.com")
+            for cookie in cookies:
+                try:
+                    self.driver.add_cookie(cookie)
+                except Exception as e:
+                    self.logger.warning(f"Could not copy cookie {cookie.get('name')}: {e}")
+            self.driver.refresh()
+            
+            self.is_logged_in = True
+            self.logger.info("Logged in with shared session cookies")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Cookie login failed: {e}")
+            return False
+
     def ensure_python_language(self):
         """Ensure Python is selected as the programming language"""
         try:
@@ -329,11 +1566,28 @@ class LeetCodeAgent:
                 element = self.driver.find_element(By.XPATH, selector)
                 text = element.text.strip()
                 if text and len(text) > 200:
-                    return text
+                    return self._render_superscripts(element) or text
             except:
                 continue
         return ""
 
+    def _render_superscripts(self, element) -> str:
+        """Element text with <sup>k</sup> written as ^k, so 10<sup>4</sup> doesn't read as 104"""
+        try:
+            text = self.driver.execute_script("""
+                const clone = arguments[0].cloneNode(true);
+                clone.querySelectorAll('sup').forEach(sup => sup.replaceWith('^' + sup.textContent));
+                clone.style.position = 'absolute';
+                clone.style.left = '-100000px';
+                document.body.appendChild(clone);
+                const text = clone.innerText;
+                clone.remove();
+                return text;
+            """, element)
+            return (text or "").strip()
+        except Exception:
+            return ""
+
     def _expand_hidden_content(self):
         """Click any buttons that might expand hidden content"""
         expand_buttons = [
@@ -435,8 +1689,9 @@ class LeetCodeAgent:
                 "url": self.driver.current_url
             }
 
-    def call_groq_for_solution(self, problem_data: Dict[str, Any], attempt: int = 1) -> str:
+    def call_groq_for_solution(self, problem_data: Dict[str, Any], attempt: int = 1, feedback: str = "") -> str:
         """Call Groq API to generate optimized Python solution with feedback"""
+        self.last_routing_decision = None
         if not self.groq_client:
             self.logger.error("Groq client not initialized")
             return self._mock_llm_call(problem_data)
@@ -444,6 +1699,20 @@ class LeetCodeAgent:
         try:
             # Prepare prompt with feedback if this is a retry
             feedback_note = f"\n\nNOTE: This is attempt {attempt}. " if attempt > 1 else ""
+            if feedback:
+                feedback_note += f"\n{feedback}"
+            
+            # Add the closest accepted solutions as few-shot context
+            similar = self.solution_library.similar(
+                problem_data['description'],
+                exclude=SolutionLibrary.slug_from_url(problem_data.get('url', ''))
+            )
+            examples_note = "".join(
+                f"\n\nSIMILAR ACCEPTED SOLUTION ({entry['title']}):\n{entry['code']}"
+                for entry in similar
+            )
+            if similar:
+                self.logger.info(f"Using {len(similar)} similar accepted solution(s) as context")
             
             prompt = f"""
             PROBLEM TITLE: {problem_data['title']}
@@ -454,35 +1723,72 @@ class LeetCodeAgent:
 
             CODE TEMPLATE (if available):
             {problem_data.get('code_template', 'None provided')}
+            {examples_note}
 
             Provide ONLY the complete runnable Python code solution. No explanations, no comments, just the code.
             Make sure the code is correct and handles all edge cases.
             """
             
-            self.logger.info(f"Calling Groq API for solution generation (attempt {attempt})...")
-            
-            response = self.groq_client.chat.completions.create(
-                model="openai/gpt-oss-120b",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are senior coding developer your work is to solve a problem always answer only code no answer nothing just code in python. Return only Python code without any explanations, comments, or markdown formatting. Make sure the code is correct and complete."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.1,
-                max_tokens=2048,
-                top_p=0.95,
-                stream=False
+            decision = self.model_router.choose(problem_data['difficulty'], attempt)
+            system_prompt = "You are senior coding developer your work is to solve a problem always answer only code no answer nothing just code in python. Return only Python code without any explanations, comments, or markdown formatting. Make sure the code is correct and complete."
+            
+            # Reserve roughly 4 characters per prompt token plus the completion limit
+            prompt_tokens = (len(system_prompt) + len(prompt)) // 4
+            reservation = self.token_budget.acquire(
+                prompt_tokens + decision['max_tokens'],
+                self.usage_ledger.cost(decision['model'], prompt_tokens, decision['max_tokens'])
+            )
+            if reservation is None:
+                self.logger.warning("💸 Token spend cap reached, not calling Groq")
+                return ""
+            
+            self.last_routing_decision = decision
+            self.logger.info(
+                f"Calling Groq API for solution generation (attempt {attempt}, "
+                f"model {decision['model']}, max_tokens {decision['max_tokens']})..."
+            )
+            
+            started = time.perf_counter()
+            try:
+                response = self.groq_client.chat.completions.create(
+                    model=decision['model'],
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": system_prompt
+                        },
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ],
+                    temperature=0.1,
+                    max_tokens=decision['max_tokens'],
+                    top_p=0.95,
+                    stream=False
+                )
+            except Exception:
+                self.token_budget.settle(reservation, 0, 0.0)
+                self.model_router.record_generation(decision, time.perf_counter() - started, ok=False)
+                self.last_routing_decision = None
+                raise
+            
+            latency = time.perf_counter() - started
+            call = self.usage_ledger.record_call(
+                self.batch_id, SolutionLibrary.slug_from_url(problem_data.get('url', '')),
+                problem_data['difficulty'], attempt, decision['model'], response.usage, latency
+            )
+            self.token_budget.settle(reservation, call['total_tokens'], call['cost'])
+            self.logger.info(
+                f"🔢 Tokens: {call['prompt_tokens']} prompt + {call['completion_tokens']} completion "
+                f"(${call['cost']:.5f}, {latency:.1f}s)"
             )
             
             solution_code = response.choices[0].message.content.strip()
             
             # Clean up the response
             solution_code = self._clean_code_response(solution_code)
+            self.model_router.record_generation(decision, latency, ok=bool(solution_code))
             
             self.logger.info("Groq solution generated successfully")
             self.logger.info(f"Solution code length: {len(solution_code)} characters")
@@ -545,108 +1851,117 @@ class LeetCodeAgent:
     def solve(self, data):
         pass"""
 
-    def input_solution_code(self, solution_code: str) -> bool:
-        """Input solution code into the editor"""
-        try:
-            self.logger.info("Attempting to input solution code...")
-            
-            # Clear existing code first
-            clear_script = """
-            // Function to clear editor
-            function clearEditor() {
-                // Try Monaco editor
-                if (window.monaco && window.monaco.editor) {
-                    const editors = monaco.editor.getEditors();
-                    if (editors.length > 0) {
-                        const model = editors[0].getModel();
-                        model.setValue('');
-                        return true;
-                    }
-                }
-                
-                // Try CodeMirror
-                const codeMirrors = document.querySelectorAll('.CodeMirror');
-                if (codeMirrors.length > 0) {
-                    for (let cm of codeMirrors) {
-                        if (cm.CodeMirror) {
-                            cm.CodeMirror.setValue('');
-                            return true;
-                        }
-                    }
-                }
-                
-                // Try textarea
-                const textareas = document.querySelectorAll('textarea');
-                for (let textarea of textareas) {
-                    if (textarea.offsetHeight > 0) {
-                        textarea.value = '';
-                        return true;
+    # Shared JS helpers: locate the live editor text and fingerprint it with
+    # 32-bit FNV-1a over UTF-16 code units (mirrored by _code_fingerprint).
+    EDITOR_JS_HELPERS = """
+    function fingerprint(text) {
+        let h = 0x811c9dc5;
+        for (let i = 0; i < text.length; i++) {
+            h ^= text.charCodeAt(i);
+            h = Math.imul(h, 16777619) >>> 0;
+        }
+        return h;
+    }
+    function findEditor() {
+        if (window.monaco && window.monaco.editor) {
+            const editors = monaco.editor.getEditors();
+            if (editors.length > 0 && editors[0].getModel()) {
+                const editor = editors[0];
+                return {
+                    get: () => editor.getModel().getValue(1),
+                    set: (code) => {
+                        const model = editor.getModel();
+                        editor.pushUndoStop();
+                        model.pushEditOperations([], [{range: model.getFullModelRange(), text: code}], () => null);
+                        editor.pushUndoStop();
                     }
-                }
-                return false;
+                };
             }
-            clearEditor();
-            """
-            
-            self.driver.execute_script(clear_script)
-            time.sleep(1)
-            
-            # Now input the solution
-            input_script = """
-            function setCode(solution) {
-                // Try Monaco editor
-                if (window.monaco && window.monaco.editor) {
-                    const editors = monaco.editor.getEditors();
-                    if (editors.length > 0) {
-                        const model = editors[0].getModel();
-                        model.setValue(solution);
-                        return true;
-                    }
-                }
-                
-                // Try CodeMirror
-                const codeMirrors = document.querySelectorAll('.CodeMirror');
-                if (codeMirrors.length > 0) {
-                    for (let cm of codeMirrors) {
-                        if (cm.CodeMirror) {
-                            cm.CodeMirror.setValue(solution);
-                            return true;
-                        }
-                    }
-                }
-                
-                // Try textarea
-                const textareas = document.querySelectorAll('textarea');
-                for (let textarea of textareas) {
-                    if (textarea.offsetHeight > 0) {
-                        textarea.value = solution;
+        }
+        for (let cm of document.querySelectorAll('.CodeMirror')) {
+            if (cm.CodeMirror) {
+                return {
+                    get: () => cm.CodeMirror.getValue('\\n'),
+                    set: (code) => cm.CodeMirror.setValue(code)
+                };
+            }
+        }
+        for (let textarea of document.querySelectorAll('textarea')) {
+            // Monaco's .inputarea and CodeMirror's hidden input are not the editor
+            // model; reading them back would "verify" whatever was just written
+            if (textarea.classList.contains('inputarea') || textarea.closest('.monaco-editor, .CodeMirror')) {
+                continue;
+            }
+            if (textarea.offsetHeight > 0) {
+                return {
+                    get: () => textarea.value,
+                    set: (code) => {
+                        textarea.value = code;
                         textarea.dispatchEvent(new Event('input', { bubbles: true }));
                         textarea.dispatchEvent(new Event('change', { bubbles: true }));
-                        return true;
                     }
-                }
-                return false;
+                };
             }
-            return setCode(arguments[0]);
+        }
+        return null;
+    }
+    """
+
+    @staticmethod
+    def _code_fingerprint(code: str) -> int:
+        """Python twin of the JS fingerprint() used to verify editor content"""
+        data = code.encode('utf-16-le')
+        h = 0x811c9dc5
+        for i in range(0, len(data), 2):
+            h ^= data[i] | (data[i + 1] << 8)
+            h = (h * 16777619) & 0xFFFFFFFF
+        return h
+
+    def _read_editor_fingerprint(self) -> Optional[int]:
+        """Read back a fingerprint of the current editor content"""
+        script = self.EDITOR_JS_HELPERS + """
+        const editor = findEditor();
+        return editor ? fingerprint(editor.get()) : null;
+        """
+        return self.driver.execute_script(script)
+
+    def input_solution_code(self, solution_code: str) -> bool:
+        """Input solution code into the editor with a single verified script call"""
+        solution_code = solution_code.replace('\r\n', '\n')
+        expected = self._code_fingerprint(solution_code)
+        try:
+            self.logger.info("Attempting to input solution code...")
+
+            # Replace the whole model in one edit and hash it in the same round trip
+            input_script = self.EDITOR_JS_HELPERS + """
+            const editor = findEditor();
+            if (!editor) {
+                return null;
+            }
+            editor.set(arguments[0]);
+            return fingerprint(editor.get());
             """
-            
+
             result = self.driver.execute_script(input_script, solution_code)
-            
-            if result:
-                self.logger.info("✅ Solution code input successfully")
-                time.sleep(2)
+
+            if result == expected:
+                self.logger.info("✅ Solution code input successfully (content verified)")
                 return True
+            elif result is None:
+                self.logger.warning("No editor found for JavaScript input, trying alternative method...")
             else:
-                self.logger.warning("JavaScript input failed, trying alternative method...")
-                return self._alternative_code_input(solution_code)
-                
+                self.logger.warning("Editor content mismatch after JavaScript input, trying alternative method...")
+            return self._alternative_code_input(solution_code)
+
         except Exception as e:
             self.logger.error(f"Code input failed: {e}")
             return self._alternative_code_input(solution_code)
 
     def _alternative_code_input(self, solution_code: str) -> bool:
-        """Alternative method for code input"""
+        """Alternative method for code input using one bulk text insertion"""
         try:
+            expected = self._code_fingerprint(solution_code)
+
             # Click in the editor area
             editor_selectors = [
                 "//div[contains(@class, 'CodeMirror')]",
@@ -654,77 +1969,133 @@ class LeetCodeAgent:
                 "//div[contains(@class, 'view-lines')]",
                 "//textarea"
             ]
-            
+
             for selector in editor_selectors:
                 try:
                     editor = WebDriverWait(self.driver, 5).until(
                         EC.element_to_be_clickable((By.XPATH, selector))
                     )
                     editor.click()
-                    time.sleep(1)
                     break
                 except:
                     continue
-            
+
             # Select all and delete
             actions = ActionChains(self.driver)
-            actions.key_down(Keys.CONTROL).send_keys('a').key_up(Keys.CONTROL).perform()
-            time.sleep(0.5)
-            actions.send_keys(Keys.DELETE).perform()
-            time.sleep(0.5)
-            
-            # Type the solution
-            actions.send_keys(solution_code).perform()
-            time.sleep(2)
-            
-            self.logger.info("Alternative code input successful")
+            actions.key_down(Keys.CONTROL).send_keys('a').key_up(Keys.CONTROL).send_keys(Keys.DELETE).perform()
+
+            # Insert the whole solution as one input event so auto-indent and
+            # auto-close do not fire per keystroke
+            try:
+                self.driver.execute_cdp_cmd("Input.insertText", {"text": solution_code})
+            except Exception as e:
+                self.logger.warning(f"CDP insertText unavailable ({e}), falling back to execCommand")
+                self.driver.execute_script(
+                    "return document.execCommand('insertText', false, arguments[0]);",
+                    solution_code
+                )
+
+            actual = self._read_editor_fingerprint()
+            if actual is None:
+                self.logger.warning("Alternative code input sent, but the editor content could not be read back to verify it")
+                return True
+            if actual != expected:
+                self.logger.error("Alternative code input does not match the solution")
+                return False
+
+            self.logger.info("Alternative code input successful (content verified)")
             return True
-            
+
         except Exception as e:
             self.logger.error(f"Alternative code input failed: {e}")
             return False
 
-    def check_submission_result(self) -> tuple:
-        """Check submission result and return (success, result_text)"""
+    SUBMISSION_CHECK_URL = re.compile(r'/submissions/detail/[^/]+/check/?')
+
+    def _drain_network_log(self):
+        """Discard buffered network events so only the next submission is seen"""
         try:
-            # Wait for result to appear
-            time.sleep(8)
-            
-            # Check for various result indicators
-            result_selectors = [
-                "//div[contains(text(), 'Accepted')]",
-                "//span[contains(text(), 'Accepted')]",
-                "//div[contains(@data-cy, 'submission-result')]",
-                "//div[contains(@class, 'success')]",
-                "//div[contains(@class, 'text-success')]",
-                "//div[contains(text(), 'Wrong Answer')]",
-                "//div[contains(text(), 'Runtime Error')]",
-                "//div[contains(text(), 'Time Limit Exceeded')]",
-                "//div[contains(text(), 'Compile Error')]"
-            ]
+            self.driver.get_log('performance')
+        except Exception:
+            pass
+
+    def _wait_for_network_verdict(self, timeout: float = 30) -> Optional[Dict[str, Any]]:
+        """Return the final submission-check JSON as soon as the browser receives it"""
+        check_requests = set()
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                entries = self.driver.get_log('performance')
+            except Exception as e:
+                self.logger.warning(f"Network log unavailable: {e}")
+                return None
             
-            for selector in result_selectors:
-                try:
-                    result_element = WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.XPATH, selector))
-                    )
-                    result_text = result_element.text.strip()
-                    if result_text:
-                        if "Accepted" in result_text:
-                            return True, result_text
-                        else:
-                            return False, result_text
-                except:
+            for entry in entries:
+                raw = entry['message']
+                if 'Network.responseReceived' not in raw and 'Network.loadingFinished' not in raw:
                     continue
+                message = json.loads(raw)['message']
+                params = message.get('params', {})
+                request_id = params.get('requestId')
+                
+                if message['method'] == 'Network.responseReceived':
+                    if self.SUBMISSION_CHECK_URL.search(params.get('response', {}).get('url', '')):
+                        check_requests.add(request_id)
+                elif message['method'] == 'Network.loadingFinished' and request_id in check_requests:
+                    check_requests.discard(request_id)
+                    try:
+                        body = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+                        verdict = json.loads(body['body'])
+                    except Exception as e:
+                        self.logger.warning(f"Could not read submission check response: {e}")
+                        continue
+                    if verdict.get('state') == 'SUCCESS':
+                        return verdict
             
-            # If no specific result found, check for any result text
-            body_text = self.driver.find_element(By.TAG_NAME, "body").text
-            if "Accepted" in body_text:
-                return True, "Accepted (found in body text)"
-            elif any(x in body_text for x in ["Wrong Answer", "Runtime Error", "Time Limit Exceeded", "Compile Error"]):
-                return False, "Error found in body text"
+            time.sleep(0.1)
+        
+        self.logger.warning("No submission verdict captured from network traffic")
+        return None
+
+    def _format_verdict(self, verdict: Dict[str, Any]) -> tuple:
+        """Turn a submission-check JSON into (success, result_text)"""
+        status = verdict.get('status_msg', 'Unknown result')
+        success = status == 'Accepted'
+        parts = [status]
+        
+        if success:
+            if verdict.get('status_runtime'):
+                runtime = f"Runtime {verdict['status_runtime']}"
+                if verdict.get('runtime_percentile') is not None:
+                    runtime += f" (beats {float(verdict['runtime_percentile']):.2f}%)"
+                parts.append(runtime)
+            if verdict.get('status_memory'):
+                memory = f"Memory {verdict['status_memory']}"
+                if verdict.get('memory_percentile') is not None:
+                    memory += f" (beats {float(verdict['memory_percentile']):.2f}%)"
+                parts.append(memory)
+        else:
+            if verdict.get('total_testcases'):
+                parts.append(f"Passed {verdict.get('total_correct', 0)}/{verdict['total_testcases']} testcases")
+            for key, label in [('full_compile_error', 'Compile error'), ('full_runtime_error', 'Runtime error'),
+                               ('last_testcase', 'Last testcase'), ('expected_output', 'Expected'),
+                               ('code_output', 'Output')]:
+                if verdict.get(key):
+                    parts.append(f"{label}: {str(verdict[key])[:300]}")
+        
+        return success, " | ".join(parts)
+
+    def check_submission_result(self) -> tuple:
+        """Check submission result and return (success, result_text)"""
+        try:
+            verdict = self._wait_for_network_verdict()
+            self.last_verdict = verdict
+            if verdict:
+                return self._format_verdict(verdict)
             
-            return False, "Unknown result"
+            # No DOM fallback: text matches like "Accepted" in the page are not a verdict
+            self.logger.warning("No judge verdict captured from the network")
+            return False, "No verdict: submission check response was not captured"
                 
         except Exception as e:
             self.logger.error(f"Error checking submission result: {e}")
@@ -732,6 +2103,8 @@ class LeetCodeAgent:
 
     def submit_solution(self) -> tuple:
         """Submit the solution and return (success, result_text)"""
+        # Only a verdict captured for this submission counts as the judge's answer
+        self.last_verdict = None
         try:
             self.logger.info("Looking for submit button...")
             
@@ -748,7 +2121,7 @@ class LeetCodeAgent:
                         EC.element_to_be_clickable((By.XPATH, selector))
                     )
                     self.driver.execute_script("arguments[0].scrollIntoView();", submit_btn)
-                    time.sleep(1)
+                    self._drain_network_log()
                     self.driver.execute_script("arguments[0].click();", submit_btn)
                     self.logger.info("✅ Submit button clicked successfully")
                     
@@ -767,9 +2140,75 @@ class LeetCodeAgent:
             self.logger.error(f"Submission failed: {e}")
             return False, f"Submission error: {str(e)}"
 
+    def _performance_feedback(self, report: Dict[str, Any], judged: bool = False) -> str:
+        """Describe a too-slow solution for the next generation prompt"""
+        source = "got Time Limit Exceeded on LeetCode" if judged else "was too slow on large local inputs"
+        details = ""
+        if report.get("exponent") is not None:
+            details = f" (measured growth about O(n^{report['exponent']:.1f}))"
+        return (f"The previous solution {source}{details}. "
+                "Use an asymptotically faster algorithm that fits the constraints.")
+
+    def _submit_library_solution(self, problem_url: str, slug: str) -> bool:
+        """Submit a previously accepted solution straight from the library"""
+        entry = self.solution_library.get(slug)
+        if not entry:
+            return False
+        
+        try:
+            self.logger.info(f"📚 Found accepted solution for '{slug}' in library, submitting directly...")
+            self.driver.get(problem_url)
+            WebDriverWait(self.driver, 15).until(
+                EC.presence_of_element_located(
+                    (By.XPATH, "//div[contains(@class, 'monaco-editor')] | //div[contains(@class, 'CodeMirror')]")
+                )
+            )
+            self.ensure_python_language()
+            
+            if not self.input_solution_code(entry['code']):
+                return False
+            
+            success, result_text = self.submit_solution()
+            self.last_result_text = result_text
+            if success:
+                self.logger.info(f"🎉 Library solution accepted: {result_text}")
+                return True
+            
+            if self.last_verdict:
+                self.logger.warning(f"Library solution no longer passes ({result_text}), removing it")
+                self.solution_library.remove(slug)
+            else:
+                self.logger.warning(f"Library submission got no judge verdict ({result_text}), keeping it")
+            return False
+            
+        except Exception as e:
+            self.logger.warning(f"Library submission failed: {e}")
+            return False
+
     def solve_problem_with_feedback(self, problem_url: str) -> bool:
         """Solve problem with feedback loop and retry mechanism"""
+        self.last_result_text = ""
+        slug = SolutionLibrary.slug_from_url(problem_url)
+        update_log_context(problem=slug, attempt=None)
+        self.usage_ledger.start_problem(self.batch_id, slug)
+        
+        solved = self._submit_library_solution(problem_url, slug) or self._solve_with_retries(problem_url, slug)
+        
+        self.last_usage = self.usage_ledger.finish_problem(self.batch_id, slug, solved)
+        self.logger.info(
+            f"🔢 Problem usage: {self.last_usage['total_tokens']} tokens over {self.last_usage['calls']} call(s), "
+            f"${self.last_usage['cost']:.5f}"
+        )
+        return solved
+
+    def _solve_with_retries(self, problem_url: str, slug: str) -> bool:
+        """Generate, gate and submit solutions until accepted or out of attempts"""
+        feedback = ""
         for attempt in range(self.max_retries):
+            update_log_context(attempt=attempt + 1)
+            if self.token_budget.exhausted():
+                self.logger.warning("💸 Token spend cap reached, giving up on this problem")
+                return False
             try:
                 self.logger.info(f"🚀 Attempt {attempt + 1} for problem")
                 
@@ -781,13 +2220,38 @@ class LeetCodeAgent:
                     self.logger.error("Failed to extract problem data")
                     continue
 
-                # Step 2: Generate solution using Groq
+                # Step 2: Generate solution candidates using Groq and time them locally
                 self.logger.info("Step 2: Generating solution with Groq...")
-                solution_code = self.call_groq_for_solution(problem_data, attempt + 1)
+                candidates = []
+                ranked = []
+                for _ in range(self.max_candidates):
+                    solution_code = self.call_groq_for_solution(problem_data, attempt + 1, feedback)
+                    if not solution_code:
+                        if self.token_budget.exhausted():
+                            break
+                        continue
+                    candidates.append({"code": solution_code, "decision": self.last_routing_decision})
+                    ranked = self.performance_gate.rank(candidates, problem_data)
+                    if ranked[0]["report"]["status"] != "reject":
+                        break
+                    feedback = self._performance_feedback(ranked[0]["report"])
                 
-                if not solution_code:
+                if not ranked:
+                    if self.token_budget.exhausted():
+                        self.logger.warning("💸 Token spend cap reached, giving up on this problem")
+                        return False
                     self.logger.error("Failed to generate solution")
                     continue
+                
+                best = ranked[0]
+                for candidate in ranked:
+                    if candidate["report"]["status"] == "reject" and candidate["decision"]:
+                        self.model_router.record_outcome(candidate["decision"], False, "Rejected by local performance gate")
+                
+                if best["report"]["status"] == "reject" and attempt < self.max_retries - 1:
+                    self.logger.warning("❌ All candidates failed the local performance gate, regenerating...")
+                    continue
+                solution_code = best["code"]
 
                 # Step 3: Input solution code
                 self.logger.info("Step 3: Inputting solution code...")
@@ -798,13 +2262,20 @@ class LeetCodeAgent:
                 # Step 4: Submit solution and check result
                 self.logger.info("Step 4: Submitting solution...")
                 success, result_text = self.submit_solution()
+                self.last_result_text = result_text
+                # Don't blame the model for submit or network failures without a verdict
+                if best["decision"] and best["report"]["status"] != "reject" and self.last_verdict:
+                    self.model_router.record_outcome(best["decision"], success, result_text)
                 
                 if success:
                     self.logger.info(f"🎉 Problem solved successfully on attempt {attempt + 1}!")
                     self.logger.info(f"Result: {result_text}")
+                    self.solution_library.add(slug, problem_data, solution_code)
                     return True
                 else:
                     self.logger.warning(f"❌ Attempt {attempt + 1} failed: {result_text}")
+                    if "Time Limit Exceeded" in result_text:
+                        feedback = self._performance_feedback(best["report"], judged=True)
                     
                     # If not last attempt, wait and retry
                     if attempt < self.max_retries - 1:
@@ -821,12 +2292,70 @@ class LeetCodeAgent:
         self.logger.error(f"❌ All {self.max_retries} attempts failed")
         return False
 
+    def _lookup_difficulty(self, slug: str) -> str:
+        """Fetch a problem's difficulty from the LeetCode GraphQL API without opening it"""
+        try:
+            response = self.session.post(
+                "https://leetcode.com/graphql",
+                json={
+                    "query": "query questionDifficulty($titleSlug: String!) { question(titleSlug: $titleSlug) { difficulty } }",
+                    "variables": {"titleSlug": slug}
+                },
+                timeout=5
+            )
+            return response.json()["data"]["question"]["difficulty"] or "Unknown"
+        except Exception:
+            return "Unknown"
+
+    def estimate_problem(self, problem_url: str) -> Tuple[float, float, float]:
+        """Expected (solve rate, tokens, cost) of a problem from past usage of its difficulty"""
+        slug = SolutionLibrary.slug_from_url(problem_url)
+        if self.solution_library.get(slug):
+            # Library hits are resubmitted without calling Groq
+            return 1.0, 0.0, 0.0
+        difficulty = self._lookup_difficulty(slug)
+        return (self.usage_ledger.solve_rate(difficulty), self.usage_ledger.expected_tokens(difficulty),
+                self.usage_ledger.expected_cost(difficulty))
+
+    def schedule_by_budget(self, problem_list: list) -> list:
+        """Put the best expected solves per token first when the token budget is tight"""
+        if not self.token_budget.limited:
+            return problem_list
+        
+        estimates = [(problem_url, *self.estimate_problem(problem_url)) for problem_url in problem_list]
+        
+        total_tokens = sum(tokens for _, _, tokens, _ in estimates)
+        total_cost = sum(cost for _, _, _, cost in estimates)
+        if not self.token_budget.is_tight(total_tokens, total_cost):
+            return problem_list
+        
+        ordered = sorted(estimates, key=lambda e: e[1] / max(e[2], 1.0), reverse=True)
+        self.logger.info(
+            f"💸 Budget is tight (~{total_tokens:.0f} tokens, ~${total_cost:.4f} expected); "
+            "ordering problems by expected solves per token"
+        )
+        return [problem_url for problem_url, _, _, _ in ordered]
+
+    def finish_batch(self) -> Dict[str, Any]:
+        """Write the current batch's usage totals to the ledger and log them"""
+        usage = self.usage_ledger.finish_batch(self.batch_id)
+        self.logger.info(
+            f"🔢 Batch usage: {usage['total_tokens']} tokens ({usage['prompt_tokens']} prompt, "
+            f"{usage['completion_tokens']} completion) over {usage['calls']} call(s), ${usage['cost']:.5f}"
+        )
+        return usage
+
     def run_automation(self, problem_list: list):
         """Run automation for multiple problems"""
         self.logger.info(f"🚀 Starting automation for {len(problem_list)} problems")
+        self.batch_id = uuid.uuid4().hex[:8]
+        problem_list = self.schedule_by_budget(problem_list)
         
         solved_count = 0
         for i, problem_url in enumerate(problem_list, 1):
+            if self.token_budget.exhausted():
+                self.logger.warning(f"💸 Token spend cap reached, skipping {len(problem_list) - i + 1} remaining problem(s)")
+                break
             self.logger.info(f"📝 Processing problem {i}/{len(problem_list)}")
             self.logger.info(f"🔗 URL: {problem_url}")
             
@@ -843,6 +2372,7 @@ class LeetCodeAgent:
                 time.sleep(5)
         
         self.logger.info(f"🏁 Automation completed. Solved {solved_count}/{len(problem_list)} problems")
+        self.finish_batch()
         print(f"\n🎯 Final Result: Solved {solved_count}/{len(problem_list)} problems")
 
     def close(self):
@@ -851,15 +2381,802 @@ class LeetCodeAgent:
             self.driver.quit()
             self.logger.info("🔚 Browser closed")
 
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """HTTP API of the agent service"""
+
+    service = None
+
+    def log_message(self, format, *args):
+        self.service.logger.debug(f"HTTP {self.address_string()} - {format % args}")
+
+    def _send_json(self, status: int, payload: Any):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode('utf-8'))
+
+    @staticmethod
+    def _job_urls(payload: Any) -> Optional[List[str]]:
+        """URLs of a job request ({"url": str} or {"urls": [str, ...]}); None if malformed"""
+        if not isinstance(payload, dict):
+            return None
+        if 'urls' in payload:
+            urls = payload['urls']
+        elif 'url' in payload:
+            urls = [payload['url']]
+        else:
+            return None
+        if not isinstance(urls, list) or not urls:
+            return None
+        if not all(isinstance(url, str) and url.strip() for url in urls):
+            return None
+        return [url.strip() for url in urls]
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, self.service.status())
+        elif self.path == '/jobs':
+            self._send_json(200, self.service.list_jobs())
+        elif self.path.startswith('/jobs/'):
+            job = self.service.get_job(self.path[len('/jobs/'):])
+            if job:
+                self._send_json(200, job)
+            else:
+                self._send_json(404, {"error": "job not found"})
+        elif self.path == '/events':
+            self._stream_events()
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path == '/jobs':
+            try:
+                payload = self._read_json()
+            except ValueError:
+                self._send_json(400, {"error": "invalid JSON"})
+                return
+            urls = self._job_urls(payload)
+            if urls is None:
+                self._send_json(400, {"error": "expected an object with 'url' (string) or 'urls' (non-empty list of strings)"})
+                return
+            jobs = self.service.enqueue(urls)
+            if jobs is None:
+                self._send_json(503, {"error": "service is shutting down"})
+            else:
+                self._send_json(202, {"jobs": jobs})
+        elif self.path == '/shutdown':
+            self._send_json(202, {"status": "draining"})
+            threading.Thread(target=self.service.shutdown, daemon=True).start()
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def _stream_events(self):
+        """Stream job updates as newline-delimited JSON until the service stops"""
+        events = self.service.subscribe()
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.end_headers()
+            while True:
+                event = events.get()
+                if event is None:
+                    break
+                self.wfile.write((json.dumps(event) + '\n').encode('utf-8'))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.service.unsubscribe(events)
+
+
+class AgentService:
+    """Keep logged-in agents warm and solve problems enqueued over a local HTTP API"""
+
+    def __init__(self, groq_api_key: str = None, workers: int = 1,
+                 host: str = '127.0.0.1', port: int = 8765, token_budget: Optional[TokenBudget] = None,
+                 profiler: Optional[CommandProfiler] = None):
+        self.groq_api_key = groq_api_key
+        self.token_budget = token_budget
+        self.profiler = profiler
+        self.worker_count = max(1, workers)
+        self.host = host
+        self.port = port
+        self.logger = logging.getLogger(__name__)
+        self.agents = []
+        self.threads = []
+        self.jobs = {}
+        # (priority, sequence, job id): FIFO unless a token budget orders jobs by solves per token
+        self.job_queue = queue.PriorityQueue()
+        self.sequence = 0
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.accepting = True
+        self.stopping = threading.Event()
+        self.server = None
+        self.serving = False
+
+    def bind(self):
+        """Claim the HTTP port before any browser is opened; raises OSError if it is taken"""
+        handler = type('BoundServiceRequestHandler', (ServiceRequestHandler,), {'service': self})
+        self.server = ThreadingHTTPServer((self.host, self.port), handler)
+        self.server.daemon_threads = True
+
+    def start(self) -> bool:
+        """Log in once, clone the session into the worker pool and start workers"""
+        primary = LeetCodeAgent(groq_api_key=self.groq_api_key, token_budget=self.token_budget,
+                                profiler=self.profiler)
+        if not primary.manual_login():
+            primary.close()
+            return False
+        self.agents.append(primary)
+        
+        cookies = primary.driver.get_cookies()
+        for _ in range(self.worker_count - 1):
+            agent = LeetCodeAgent(profiler=self.profiler)
+            agent.groq_client = primary.groq_client
+            agent.model_router = primary.model_router
+            agent.solution_library = primary.solution_library
+            agent.usage_ledger = primary.usage_ledger
+            agent.token_budget = primary.token_budget
+            agent.batch_id = primary.batch_id
+            if agent.login_with_cookies(cookies):
+                self.agents.append(agent)
+            else:
+                agent.close()
+        
+        for index, agent in enumerate(self.agents):
+            thread = threading.Thread(target=self._worker, args=(agent,), name=f"agent-worker-{index}")
+            thread.start()
+            self.threads.append(thread)
+        
+        self.logger.info(f"🟢 Agent service ready with {len(self.agents)} warm worker(s)")
+        return True
+
+    def serve(self):
+        """Serve the HTTP API until shutdown is requested"""
+        if self.server is None:
+            self.bind()
+        
+        if threading.current_thread() is threading.main_thread():
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(sig, lambda *_: threading.Thread(target=self.shutdown, daemon=True).start())
+        
+        self.logger.info(f"🌐 Listening on http://{self.host}:{self.port}")
+        print(f"\n🌐 Agent service listening on http://{self.host}:{self.port}")
+        print("   POST /jobs {\"url\": ...} | GET /jobs | GET /jobs/<id> | GET /events | POST /shutdown")
+        self.serving = True
+        try:
+            self.server.serve_forever()
+        finally:
+            self.serving = False
+            # Stop workers and release browsers even if serving failed
+            self.shutdown()
+            self.server.server_close()
+
+    def _publish(self, job: Dict[str, Any]):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for events in subscribers:
+            events.put(dict(job))
+
+    def _update_job(self, job_id: str, **changes):
+        with self.lock:
+            job = self.jobs[job_id]
+            job.update(changes)
+            snapshot = dict(job)
+        self._publish(snapshot)
+
+    def subscribe(self) -> queue.Queue:
+        events = queue.Queue()
+        with self.lock:
+            self.subscribers.append(events)
+        return events
+
+    def unsubscribe(self, events: queue.Queue):
+        with self.lock:
+            if events in self.subscribers:
+                self.subscribers.remove(events)
+
+    def _priority(self, url: str) -> float:
+        """Lower runs first: best expected solves per token when a token budget is set"""
+        if not self.agents or not self.agents[0].token_budget.limited:
+            return 0.0
+        solve_rate, tokens, _ = self.agents[0].estimate_problem(url)
+        return -solve_rate / max(tokens, 1.0)
+
+    def enqueue(self, urls: List[str]) -> Optional[List[Dict[str, Any]]]:
+        """Queue problem URLs; None once the service is draining"""
+        if not self.accepting:
+            return None
+        priorities = {url: self._priority(url) for url in urls}
+        created = []
+        with self.lock:
+            if not self.accepting:
+                return None
+            for url in urls:
+                job = {"id": uuid.uuid4().hex[:12], "url": url, "status": "queued",
+                       "created_at": time.time(), "started_at": None, "finished_at": None,
+                       "success": None, "result": "", "usage": None}
+                self.jobs[job["id"]] = job
+                created.append(dict(job))
+        for job in created:
+            self._publish(job)
+            with self.lock:
+                self.sequence += 1
+                sequence = self.sequence
+            self.job_queue.put((priorities[job["url"]], sequence, job["id"]))
+            self.logger.info(f"📥 Queued job {job['id']}: {job['url']}")
+        return created
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [dict(job) for job in self.jobs.values()]
+
+    def status(self) -> Dict[str, Any]:
+        with self.lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            return {"accepting": self.accepting, "workers": len(self.agents), "jobs": counts}
+
+    def _worker(self, agent: 'LeetCodeAgent'):
+        """Solve queued problems with one warm agent until the service stops"""
+        update_log_context(worker=f"{DEFAULT_WORKER_ID}/{threading.current_thread().name}")
+        while not self.stopping.is_set():
+            try:
+                _, _, job_id = self.job_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            
+            with self.lock:
+                if self.jobs[job_id]["status"] != "queued":
+                    continue
+            self._update_job(job_id, status="running", started_at=time.time())
+            
+            try:
+                success = agent.solve_problem_with_feedback(self.jobs[job_id]["url"])
+                result, usage = agent.last_result_text, agent.last_usage
+            except Exception as e:
+                self.logger.error(f"Job {job_id} crashed: {e}")
+                success, result, usage = False, f"Error: {e}", None
+            
+            self._update_job(job_id, status="solved" if success else "failed", success=success,
+                             result=result, usage=usage, finished_at=time.time())
+
+    def shutdown(self):
+        """Stop accepting jobs, cancel queued ones, finish in-flight work and release browsers"""
+        with self.lock:
+            if not self.accepting:
+                return
+            self.accepting = False
+        self.logger.info("🛑 Shutting down agent service, draining in-flight jobs...")
+        
+        with self.lock:
+            queued = [job_id for job_id, job in self.jobs.items() if job["status"] == "queued"]
+        for job_id in queued:
+            self._update_job(job_id, status="cancelled", finished_at=time.time())
+        
+        self.stopping.set()
+        for thread in self.threads:
+            thread.join()
+        if self.agents:
+            # Workers share the primary agent's ledger and batch
+            self.agents[0].finish_batch()
+        for agent in self.agents:
+            agent.close()
+        
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for events in subscribers:
+            events.put(None)
+        if self.server and self.serving:
+            self.server.shutdown()
+        self.logger.info("🔚 Agent service stopped")
+
+
+class WorkQueue(ABC):
+    """Shared queue of problem URLs leased to workers with a visibility timeout.
+
+    A leased task that is neither completed nor extended before its lease
+    expires becomes available again, up to max_attempts leases in total.
+    """
+
+    def __init__(self, max_attempts: int = 3):
+        self.max_attempts = max_attempts
+
+    @abstractmethod
+    def enqueue(self, urls: List[str]) -> List[str]:
+        pass
+
+    @abstractmethod
+    def lease(self, worker_id: str, visibility_timeout: float) -> Optional[Dict[str, Any]]:
+        """Claim the next available task, or None when nothing is available"""
+
+    @abstractmethod
+    def extend(self, task_id: str, token: str, visibility_timeout: float) -> bool:
+        pass
+
+    @abstractmethod
+    def complete(self, task_id: str, token: str, success: bool, result: str) -> bool:
+        """Record the final result; False if the lease was lost to another worker"""
+
+    @abstractmethod
+    def release(self, task_id: str, token: str, error: str) -> bool:
+        """Give a task back after a crash so another worker can retry it"""
+
+    @abstractmethod
+    def reap_expired(self) -> int:
+        """Requeue expired leases (or mark them dead after max_attempts); returns how many"""
+
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        pass
+
+    @abstractmethod
+    def results(self) -> List[Dict[str, Any]]:
+        pass
+
+    def is_drained(self) -> bool:
+        # Without reaping, a lease held by a worker that died would look busy forever
+        self.reap_expired()
+        counts = self.counts()
+        return not counts.get('pending') and not counts.get('leased')
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """Work queue in a SQLite file that every worker can reach"""
+
+    def __init__(self, path: str, max_attempts: int = 3):
+        super().__init__(max_attempts)
+        self.path = path
+        with closing(self._connect()) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    url TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_owner TEXT,
+                    lease_token TEXT,
+                    lease_expires REAL,
+                    success INTEGER,
+                    result TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def enqueue(self, urls: List[str]) -> List[str]:
+        now = time.time()
+        ids = []
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for url in urls:
+                cursor = conn.execute(
+                    "INSERT INTO tasks (url, created_at, updated_at) VALUES (?, ?, ?)", (url, now, now)
+                )
+                ids.append(str(cursor.lastrowid))
+            conn.execute("COMMIT")
+        return ids
+
+    def _reap_expired(self, conn: sqlite3.Connection, now: float) -> int:
+        cursor = conn.execute(
+            "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'dead' ELSE 'pending' END, "
+            "result = CASE WHEN attempts >= ? THEN COALESCE(result, 'Lease expired after max attempts') "
+            "ELSE result END, lease_token = NULL, updated_at = ? "
+            "WHERE status = 'leased' AND lease_expires < ?",
+            (self.max_attempts, self.max_attempts, now, now)
+        )
+        return cursor.rowcount
+
+    def reap_expired(self) -> int:
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            reaped = self._reap_expired(conn, time.time())
+            conn.execute("COMMIT")
+        return reaped
+
+    def lease(self, worker_id: str, visibility_timeout: float) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        token = uuid.uuid4().hex
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._reap_expired(conn, now)
+            row = conn.execute(
+                "SELECT id, url, attempts FROM tasks WHERE status = 'pending' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE tasks SET status = 'leased', attempts = attempts + 1, lease_owner = ?, "
+                "lease_token = ?, lease_expires = ?, updated_at = ? WHERE id = ?",
+                (worker_id, token, now + visibility_timeout, now, row['id'])
+            )
+            conn.execute("COMMIT")
+        return {"id": str(row['id']), "url": row['url'], "attempt": row['attempts'] + 1, "token": token}
+
+    def extend(self, task_id: str, token: str, visibility_timeout: float) -> bool:
+        now = time.time()
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET lease_expires = ?, updated_at = ? "
+                "WHERE id = ? AND lease_token = ? AND status = 'leased'",
+                (now + visibility_timeout, now, int(task_id), token)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, task_id: str, token: str, success: bool, result: str) -> bool:
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = ?, success = ?, result = ?, lease_token = NULL, updated_at = ? "
+                "WHERE id = ? AND lease_token = ? AND status = 'leased'",
+                ('done' if success else 'failed', int(success), result, time.time(), int(task_id), token)
+            )
+            return cursor.rowcount == 1
+
+    def release(self, task_id: str, token: str, error: str) -> bool:
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'dead' ELSE 'pending' END, "
+                "result = ?, lease_token = NULL, updated_at = ? "
+                "WHERE id = ? AND lease_token = ? AND status = 'leased'",
+                (self.max_attempts, error, time.time(), int(task_id), token)
+            )
+            return cursor.rowcount == 1
+
+    def counts(self) -> Dict[str, int]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM tasks GROUP BY status").fetchall()
+        return {row['status']: row['n'] for row in rows}
+
+    def results(self) -> List[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT id, url, status, attempts, lease_owner AS worker, success, result, updated_at "
+                "FROM tasks ORDER BY id"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+class RedisWorkQueue(WorkQueue):
+    """Work queue in Redis: a pending list, a sorted set of lease expiries and a hash per task"""
+
+    REAP_EXPIRED = """
+    local now = tonumber(ARGV[1])
+    local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)
+    for _, id in ipairs(expired) do
+        redis.call('ZREM', KEYS[2], id)
+        local key = KEYS[3] .. id
+        if tonumber(redis.call('HGET', key, 'attempts')) >= tonumber(ARGV[2]) then
+            redis.call('HSET', key, 'status', 'dead', 'token', '', 'updated_at', now,
+                       'result', 'Lease expired after max attempts')
+        else
+            redis.call('HSET', key, 'status', 'pending', 'token', '', 'updated_at', now)
+            redis.call('LPUSH', KEYS[1], id)
+        end
+    end
+    """
+
+    REAP_SCRIPT = REAP_EXPIRED + """
+    return #expired
+    """
+
+    LEASE_SCRIPT = REAP_EXPIRED + """
+    local id = redis.call('LPOP', KEYS[1])
+    if not id then
+        return nil
+    end
+    local key = KEYS[3] .. id
+    local attempts = redis.call('HINCRBY', key, 'attempts', 1)
+    redis.call('HSET', key, 'status', 'leased', 'token', ARGV[3], 'worker', ARGV[4], 'updated_at', now)
+    redis.call('ZADD', KEYS[2], ARGV[5], id)
+    return {id, redis.call('HGET', key, 'url'), attempts}
+    """
+
+    FINISH_SCRIPT = """
+    local key = KEYS[3] .. ARGV[1]
+    if redis.call('HGET', key, 'status') ~= 'leased' or redis.call('HGET', key, 'token') ~= ARGV[2] then
+        return 0
+    end
+    redis.call('ZREM', KEYS[2], ARGV[1])
+    local status = ARGV[3]
+    if status == 'retry' then
+        if tonumber(redis.call('HGET', key, 'attempts')) >= tonumber(ARGV[6]) then
+            status = 'dead'
+        else
+            status = 'pending'
+            redis.call('LPUSH', KEYS[1], ARGV[1])
+        end
+    end
+    redis.call('HSET', key, 'status', status, 'token', '', 'success', ARGV[4], 'result', ARGV[5],
+               'updated_at', ARGV[7])
+    return 1
+    """
+
+    EXTEND_SCRIPT = """
+    local key = KEYS[3] .. ARGV[1]
+    if redis.call('HGET', key, 'status') ~= 'leased' or redis.call('HGET', key, 'token') ~= ARGV[2] then
+        return 0
+    end
+    redis.call('ZADD', KEYS[2], ARGV[3], ARGV[1])
+    return 1
+    """
+
+    def __init__(self, url: str, max_attempts: int = 3, prefix: str = 'leetcode:queue'):
+        super().__init__(max_attempts)
+        if redis is None:
+            raise RuntimeError("Redis work queue requires the 'redis' package (pip install redis)")
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self.keys = [f"{prefix}:pending", f"{prefix}:leased", f"{prefix}:task:"]
+        self._lease = self.client.register_script(self.LEASE_SCRIPT)
+        self._reap = self.client.register_script(self.REAP_SCRIPT)
+        self._finish = self.client.register_script(self.FINISH_SCRIPT)
+        self._extend = self.client.register_script(self.EXTEND_SCRIPT)
+
+    def enqueue(self, urls: List[str]) -> List[str]:
+        now = time.time()
+        ids = []
+        pipe = self.client.pipeline()
+        for url in urls:
+            task_id = str(self.client.incr(f"{self.prefix}:next_id"))
+            pipe.hset(self.keys[2] + task_id, mapping={
+                "url": url, "status": "pending", "attempts": 0, "token": "",
+                "worker": "", "success": "", "result": "", "created_at": now, "updated_at": now
+            })
+            pipe.rpush(f"{self.prefix}:all", task_id)
+            pipe.rpush(self.keys[0], task_id)
+            ids.append(task_id)
+        pipe.execute()
+        return ids
+
+    def lease(self, worker_id: str, visibility_timeout: float) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        token = uuid.uuid4().hex
+        leased = self._lease(keys=self.keys, args=[now, self.max_attempts, token, worker_id,
+                                                   now + visibility_timeout])
+        if not leased:
+            return None
+        task_id, url, attempts = leased
+        return {"id": task_id, "url": url, "attempt": int(attempts), "token": token}
+
+    def reap_expired(self) -> int:
+        return int(self._reap(keys=self.keys, args=[time.time(), self.max_attempts]))
+
+    def extend(self, task_id: str, token: str, visibility_timeout: float) -> bool:
+        return bool(self._extend(keys=self.keys, args=[task_id, token, time.time() + visibility_timeout]))
+
+    def complete(self, task_id: str, token: str, success: bool, result: str) -> bool:
+        return bool(self._finish(keys=self.keys, args=[
+            task_id, token, 'done' if success else 'failed', int(success), result,
+            self.max_attempts, time.time()
+        ]))
+
+    def release(self, task_id: str, token: str, error: str) -> bool:
+        return bool(self._finish(keys=self.keys, args=[
+            task_id, token, 'retry', '', error, self.max_attempts, time.time()
+        ]))
+
+    def _tasks(self) -> List[Dict[str, Any]]:
+        ids = self.client.lrange(f"{self.prefix}:all", 0, -1)
+        pipe = self.client.pipeline()
+        for task_id in ids:
+            pipe.hgetall(self.keys[2] + task_id)
+        return [{"id": task_id, **task} for task_id, task in zip(ids, pipe.execute())]
+
+    def counts(self) -> Dict[str, int]:
+        counts = {}
+        for task in self._tasks():
+            counts[task['status']] = counts.get(task['status'], 0) + 1
+        return counts
+
+    def results(self) -> List[Dict[str, Any]]:
+        return [{
+            "id": task['id'], "url": task['url'], "status": task['status'],
+            "attempts": int(task['attempts']), "worker": task['worker'] or None,
+            "success": int(task['success']) if task['success'] != '' else None,
+            "result": task['result'], "updated_at": float(task['updated_at'])
+        } for task in self._tasks()]
+
+
+def make_work_queue(spec: str, max_attempts: int = 3) -> WorkQueue:
+    """Build a work queue from sqlite:///path/to/queue.db, redis://host:port/db or a plain file path"""
+    if spec.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisWorkQueue(spec, max_attempts=max_attempts)
+    if spec.startswith('sqlite:///'):
+        spec = spec[len('sqlite:///'):]
+    return SQLiteWorkQueue(spec, max_attempts=max_attempts)
+
+
+class QueueWorker:
+    """Lease problems from a shared work queue and solve them with one agent"""
+
+    def __init__(self, work_queue: WorkQueue, agent: 'LeetCodeAgent', worker_id: str = None,
+                 visibility_timeout: float = 900, poll_interval: float = 2.0):
+        self.work_queue = work_queue
+        self.agent = agent
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self.stopping = threading.Event()
+        self.logger = logging.getLogger(__name__)
+
+    def _keep_alive(self, task: Dict[str, Any], done: threading.Event):
+        """Extend the lease while the task is being solved"""
+        while not done.wait(self.visibility_timeout / 3):
+            if not self.work_queue.extend(task['id'], task['token'], self.visibility_timeout):
+                self.logger.warning(f"Lost lease on task {task['id']}")
+                return
+
+    def run(self, exit_when_idle: bool = False) -> int:
+        """Process tasks until stopped (or until the queue drains); returns tasks handled"""
+        handled = 0
+        update_log_context(worker=self.worker_id)
+        self.logger.info(f"👷 Worker {self.worker_id} polling the work queue")
+        try:
+            while not self.stopping.is_set():
+                task = self.work_queue.lease(self.worker_id, self.visibility_timeout)
+                if task is None:
+                    if exit_when_idle and self.work_queue.is_drained():
+                        break
+                    self.stopping.wait(self.poll_interval)
+                    continue
+            
+                self.logger.info(f"📥 Leased task {task['id']} (lease {task['attempt']}): {task['url']}")
+                done = threading.Event()
+                keep_alive = threading.Thread(target=self._keep_alive, args=(task, done), daemon=True)
+                keep_alive.start()
+                try:
+                    success = self.agent.solve_problem_with_feedback(task['url'])
+                    if not self.work_queue.complete(task['id'], task['token'], success, self.agent.last_result_text):
+                        self.logger.warning(f"Result for task {task['id']} discarded: lease was lost")
+                except BaseException as e:
+                    self.logger.error(f"Task {task['id']} crashed: {e!r}, returning it to the queue")
+                    self.work_queue.release(task['id'], task['token'], f"Worker {self.worker_id} error: {e!r}")
+                    if not isinstance(e, Exception):
+                        raise
+                finally:
+                    done.set()
+                handled += 1
+        finally:
+            self.agent.finish_batch()
+        return handled
+
+    def stop(self):
+        self.stopping.set()
+
+
+class QueueCoordinator:
+    """Enqueue a batch into the shared work queue and report results centrally"""
+
+    def __init__(self, work_queue: WorkQueue, poll_interval: float = 10.0):
+        self.work_queue = work_queue
+        self.poll_interval = poll_interval
+        self.logger = logging.getLogger(__name__)
+
+    def run(self, urls: List[str], wait: bool = True) -> List[Dict[str, Any]]:
+        if urls:
+            ids = self.work_queue.enqueue(urls)
+            self.logger.info(f"📤 Enqueued {len(ids)} problems")
+        
+        while wait and not self.work_queue.is_drained():
+            self.logger.info(f"📊 Queue status: {self.work_queue.counts()}")
+            time.sleep(self.poll_interval)
+        
+        results = self.work_queue.results()
+        solved = sum(1 for result in results if result['status'] == 'done')
+        for result in results:
+            print(f"  [{result['status']:>7}] {result['url']} ({result['worker']}, {result['attempts']} lease(s))")
+        print(f"\n🎯 Final Result: Solved {solved}/{len(results)} problems")
+        return results
+
+
 def main():
     """Main execution function"""
+    parser = argparse.ArgumentParser(description="LeetCode Automation Agent with Groq")
+    parser.add_argument('--serve', action='store_true', help="run as a long-lived service with a local HTTP API")
+    parser.add_argument('--host', default='127.0.0.1', help="service bind address")
+    parser.add_argument('--port', type=int, default=8765, help="service port")
+    parser.add_argument('--workers', type=int, default=1, help="number of warm browser workers in service mode")
+    parser.add_argument('--queue', help="shared work queue: sqlite:///path/queue.db or redis://host:6379/0")
+    parser.add_argument('--enqueue', nargs='*', metavar='URL',
+                        help="coordinator: add problem URLs to the queue and wait for results")
+    parser.add_argument('--worker', action='store_true', help="lease and solve problems from the queue")
+    parser.add_argument('--exit-when-idle', action='store_true', help="worker: exit once the queue is drained")
+    parser.add_argument('--trace', metavar='FILE',
+                        help="profile WebDriver commands and write a Chrome trace to FILE")
+    parser.add_argument('--tpm', type=int, help="cap on Groq tokens per minute across all solves")
+    parser.add_argument('--max-spend', type=float, metavar='USD', help="cap on total Groq spend for this run")
+    parser.add_argument('--logs', action='store_true', help="query structured logs of past runs and exit")
+    parser.add_argument('--log-dir', default='logs', help="directory of structured logs")
+    parser.add_argument('--problem', help="logs: only this problem slug")
+    parser.add_argument('--worker-id', help="logs: only this worker id")
+    parser.add_argument('--level', type=str.upper, choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+                        help="logs: minimum level")
+    parser.add_argument('--grep', help="logs: only events containing this text")
+    parser.add_argument('--since', type=float, metavar='HOURS', help="logs: only the last N hours")
+    parser.add_argument('--stats', action='store_true', help="logs: per-problem summary instead of events")
+    args = parser.parse_args()
+    
+    if args.logs:
+        LogQuery(args.log_dir).run(
+            stats=args.stats, problem=args.problem, worker=args.worker_id, level=args.level,
+            grep=args.grep, since=time.time() - args.since * 3600 if args.since else None
+        )
+        return
+    
+    setup_log_pipeline(args.log_dir)
+    
     print("🤖 LeetCode Automation Agent with Groq")
     print("=" * 50)
     
     # Groq API key
     groq_api_key = "Your Key"
     
-    agent = LeetCodeAgent(groq_api_key=groq_api_key)
+    token_budget = TokenBudget(tokens_per_minute=args.tpm, max_spend=args.max_spend)
+    profiler = CommandProfiler() if args.trace else None
+    
+    if args.serve:
+        service = AgentService(groq_api_key=groq_api_key, workers=args.workers, host=args.host, port=args.port,
+                               token_budget=token_budget, profiler=profiler)
+        try:
+            service.bind()
+        except OSError as e:
+            print(f"❌ Cannot listen on {args.host}:{args.port}: {e}")
+            return
+        if not service.start():
+            print("❌ Manual login failed.")
+            service.server.server_close()
+            return
+        try:
+            service.serve()
+        finally:
+            if profiler:
+                profiler.log_summary()
+                profiler.export(args.trace)
+        return
+    
+    if args.queue and args.enqueue is not None:
+        QueueCoordinator(make_work_queue(args.queue)).run(args.enqueue)
+        return
+    
+    if args.queue and args.worker:
+        agent = LeetCodeAgent(groq_api_key=groq_api_key, profiler=profiler, token_budget=token_budget)
+        try:
+            if not agent.manual_login():
+                print("❌ Manual login failed.")
+                return
+            QueueWorker(make_work_queue(args.queue), agent).run(exit_when_idle=args.exit_when_idle)
+        except KeyboardInterrupt:
+            print("\n⏹️ Worker stopped by user")
+        finally:
+            agent.close()
+            if profiler:
+                profiler.log_summary()
+                profiler.export(args.trace)
+        return
+    
+    agent = LeetCodeAgent(groq_api_key=groq_api_key, profiler=profiler, token_budget=token_budget)
     
     try:
         # Manual login
@@ -883,6 +3200,9 @@ def main():
         print(f"❌ Unexpected error: {e}")
     finally:
         agent.close()
+        if profiler:
+            profiler.log_summary()
+            profiler.export(args.trace)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
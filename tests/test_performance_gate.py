@@ -0,0 +1,124 @@
+"""Tests of the local performance gate's constraint parsing, input synthesis and sandbox"""
+import math
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from leetcode import PerformanceGate
+
+TWO_SUM_TEMPLATE = "class Solution:\n    def twoSum(self, nums: List[int], target: int) -> List[int]:\n        "
+
+
+@pytest.fixture
+def gate():
+    return PerformanceGate()
+
+
+@pytest.mark.parametrize("token, expected", [
+    ("10^4", 10**4),
+    ("-10^9", -10**9),
+    ("2 * 10^5", 2 * 10**5),
+    ("10**5", 10**5),
+    ("10⁴", 10**4),
+    ("-10⁹", -10**9),
+    ("104", 104),
+    ("105", 105),
+    ("100", 100),
+    ("1", 1),
+    ("nums.length", "nums.length"),
+])
+def test_parse_bound(token, expected):
+    assert PerformanceGate._parse_bound(token) == expected
+
+
+@pytest.mark.parametrize("token, expected", [
+    ("104", 10**4),
+    ("-109", -10**9),
+    ("105", 10**5),
+    ("101", 101),
+    ("102", 102),
+    ("100", 100),
+    ("1000", 1000),
+])
+def test_parse_bound_flattened_superscripts(token, expected):
+    assert PerformanceGate._parse_bound(token, flattened=True) == expected
+
+
+def test_parse_constraints_flattened_description(gate):
+    description = """Constraints:
+2 <= nums.length <= 104
+-109 <= nums[i] <= 109
+-109 <= target <= 109"""
+    assert gate.parse_constraints(description) == {
+        'nums.length': (2, 10**4),
+        'nums[i]': (-10**9, 10**9),
+        'target': (-10**9, 10**9),
+    }
+
+
+def test_parse_constraints_keeps_literals_when_exponents_are_marked(gate):
+    description = """Constraints:
+1 <= n <= 104
+1 <= nums.length <= 10^5
+-10^4 <= nums[i] <= 10^4"""
+    assert gate.parse_constraints(description) == {
+        'n': (1, 104),
+        'nums.length': (1, 10**5),
+        'nums[i]': (-10**4, 10**4),
+    }
+
+
+def test_parse_constraints_unicode_comparisons_and_aliases(gate):
+    description = """m == grid.length
+n == grid[i].length
+1 ≤ m, n ≤ 5 * 10^4
+0 ≤ grid[i][j] ≤ 100"""
+    bounds = gate.parse_constraints(description)
+    assert bounds['m'] == (1, 5 * 10**4)
+    assert bounds['n'] == (1, 5 * 10**4)
+    assert bounds['grid.length'] == bounds['m']
+    assert bounds['grid[i][j]'] == (0, 100)
+
+
+def test_method_signature_takes_annotations_from_template(gate):
+    code = "class Solution:\n    def twoSum(self, nums, target):\n        return []"
+    assert gate.method_signature(code, TWO_SUM_TEMPLATE) == ('twoSum', [('nums', 'List[int]'), ('target', 'int')])
+
+
+def test_build_args_scales_to_constraints(gate):
+    bounds = {'nums.length': (2, 10**4), 'nums[i]': (-5, 5), 'target': (-10, 10)}
+    params = [('nums', 'List[int]'), ('target', 'int')]
+    nums, target = gate.build_args(params, bounds, 0.5, random.Random(0))
+    assert len(nums) == 5000
+    assert all(-5 <= x <= 5 for x in nums)
+    assert target == 0
+
+
+def test_build_args_resolves_bounds_that_refer_to_other_params(gate):
+    bounds = {'s.length': (1, 1000), 'k': (1, 's.length')}
+    s, k = gate.build_args([('s', 'str'), ('k', 'int')], bounds, 1.0, random.Random(0))
+    assert len(s) == 1000
+    assert k == 1000
+
+
+def test_build_args_caps_grid_cells(gate):
+    bounds = {'m': (1, 10**5), 'n': (1, 10**5)}
+    grid, = gate.build_args([('grid', 'List[List[int]]')], bounds, 1.0, random.Random(0))
+    assert len(grid) * len(grid[0]) <= gate.MAX_ELEMENTS
+
+
+def test_build_args_rejects_unsupported_types(gate):
+    assert gate.build_args([('root', 'Optional[TreeNode]')], {}, 1.0, random.Random(0)) is None
+
+
+def test_time_run_counts_exhausted_limits_as_over_budget(gate):
+    hog = "class Solution:\n    def f(self, n):\n        return bytearray(8 * 1024**3)"
+    spin = "class Solution:\n    def f(self, n):\n        while True:\n            pass"
+    ok = "class Solution:\n    def f(self, n):\n        return sum(range(n))"
+    assert gate._time_run(hog, 'f', [1]) == math.inf
+    assert gate._time_run(spin, 'f', [1]) == math.inf
+    assert gate._time_run(ok, 'f', [1000]) < gate.TIME_BUDGET
@@ -0,0 +1,63 @@
+"""Tests of the shared token budget and how the agent stops once spend is used up"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from leetcode import LeetCodeAgent, TokenBudget
+
+
+def test_refused_call_marks_budget_exhausted():
+    budget = TokenBudget(max_spend=0.01)
+    reservation = budget.acquire(100, 0.001)
+    budget.settle(reservation, 100, 0.001)
+    assert not budget.exhausted()
+
+    # Less is left than one call's worst-case cost, though spent < max_spend
+    assert budget.acquire(100, 0.0095) is None
+    assert budget.exhausted()
+
+
+def test_concurrent_reservations_do_not_overshoot_spend_cap():
+    budget = TokenBudget(max_spend=1.0)
+    granted = []
+
+    def solve():
+        reservation = budget.acquire(100, 0.3)
+        granted.append(reservation is not None)
+        if reservation:
+            time.sleep(0.05)
+            budget.settle(reservation, 50, 0.1)
+
+    threads = [threading.Thread(target=solve) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert budget.spent <= 1.0
+    assert budget.reserved_cost == 0.0
+    assert granted.count(True) == 8
+    assert budget.exhausted()
+
+
+def test_agent_stops_retrying_once_budget_refuses(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    budget = TokenBudget(max_spend=0.01)
+    budget.spent = 0.00999
+    agent = LeetCodeAgent(token_budget=budget)
+    agent.groq_client = object()  # never reached: the budget refuses first
+    extractions = []
+
+    def extract_problem_statement(problem_url):
+        extractions.append(problem_url)
+        return {"title": "Two Sum", "difficulty": "Easy", "url": problem_url,
+                "description": "Given an array of integers nums and an integer target.",
+                "code_template": ""}
+
+    monkeypatch.setattr(agent, 'extract_problem_statement', extract_problem_statement)
+    assert agent._solve_with_retries("https://leetcode.com/problems/two-sum/", "two-sum") is False
+    assert len(extractions) == 1
+    assert budget.exhausted()
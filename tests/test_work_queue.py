@@ -0,0 +1,109 @@
+"""Multi-process tests of the shared work queue with a fake agent (no browser, no Groq)"""
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from leetcode import QueueCoordinator, QueueWorker, SQLiteWorkQueue
+
+VISIBILITY_TIMEOUT = 1.0
+
+
+class FakeAgent:
+    """Stands in for LeetCodeAgent: 'solves' every URL after a short delay"""
+
+    def __init__(self, crash: bool = False):
+        self.crash = crash
+        self.last_result_text = ""
+
+    def solve_problem_with_feedback(self, url: str) -> bool:
+        if self.crash:
+            os._exit(1)  # die mid-task without completing or releasing the lease
+        time.sleep(0.05)
+        self.last_result_text = f"Accepted by {os.getpid()}"
+        return True
+
+    def finish_batch(self):
+        return {}
+
+
+def run_worker(path: str, max_attempts: int, crash: bool = False):
+    work_queue = SQLiteWorkQueue(path, max_attempts=max_attempts)
+    worker = QueueWorker(work_queue, FakeAgent(crash), worker_id=f"worker-{os.getpid()}",
+                         visibility_timeout=VISIBILITY_TIMEOUT, poll_interval=0.05)
+    worker.run(exit_when_idle=True)
+
+
+def start_workers(path: str, count: int, max_attempts: int = 3, crash: bool = False):
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(path, max_attempts, crash))
+        for _ in range(count)
+    ]
+    for process in processes:
+        process.start()
+    return processes
+
+
+def coordinate(work_queue: SQLiteWorkQueue, timeout: float = 30):
+    """Wait for the queue to drain in a thread so a hang fails the test instead of blocking it"""
+    results = []
+    coordinator = QueueCoordinator(work_queue, poll_interval=0.1)
+    thread = threading.Thread(target=lambda: results.extend(coordinator.run([])), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "coordinator never saw the queue drain"
+    return results
+
+
+def test_workers_solve_each_task_once(tmp_path):
+    path = str(tmp_path / "queue.db")
+    work_queue = SQLiteWorkQueue(path)
+    urls = [f"https://leetcode.com/problems/p{i}/" for i in range(12)]
+    work_queue.enqueue(urls)
+
+    processes = start_workers(path, 3)
+    results = coordinate(work_queue)
+    for process in processes:
+        process.join(10)
+        assert process.exitcode == 0
+
+    assert sorted(result['url'] for result in results) == sorted(urls)
+    assert all(result['status'] == 'done' and result['attempts'] == 1 for result in results)
+
+
+def test_task_of_crashed_worker_is_retried(tmp_path):
+    path = str(tmp_path / "queue.db")
+    work_queue = SQLiteWorkQueue(path)
+    work_queue.enqueue(["https://leetcode.com/problems/two-sum/"])
+
+    crashed, = start_workers(path, 1, crash=True)
+    crashed.join(10)
+    assert crashed.exitcode == 1
+    assert work_queue.counts() == {'leased': 1}
+
+    processes = start_workers(path, 2)
+    results = coordinate(work_queue)
+    for process in processes:
+        process.join(10)
+
+    assert len(results) == 1
+    assert results[0]['status'] == 'done'
+    assert results[0]['attempts'] == 2
+
+
+def test_last_lease_lost_does_not_hang_coordinator(tmp_path):
+    path = str(tmp_path / "queue.db")
+    work_queue = SQLiteWorkQueue(path, max_attempts=1)
+    work_queue.enqueue(["https://leetcode.com/problems/two-sum/"])
+
+    crashed, = start_workers(path, 1, max_attempts=1, crash=True)
+    crashed.join(10)
+    assert crashed.exitcode == 1
+
+    results = coordinate(work_queue)
+    assert len(results) == 1
+    assert results[0]['status'] == 'dead'
+    assert results[0]['result'] == 'Lease expired after max attempts'